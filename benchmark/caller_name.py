@@ -0,0 +1,74 @@
+"""Benchmark of the caller lookup of debug(): sys._getframe against inspect.stack().
+
+Each case calls debug() from a function N frames deep, relaying to a buffered logfile in a
+temporary directory. The inspect case looks the caller up like Display_Information did
+before, with inspect.stack()[2][3]. The median of several runs is printed per call.
+
+Usage:
+    python benchmark/caller_name.py [--runs N]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import console
+
+class Inspect_Information(console.Display_Information):
+    """Looks up the caller like Display_Information did before sys._getframe.
+    """
+    def _assistant_debug(self, level, with_caller, format, *args):
+        import inspect
+
+        return console.Log_Record(level, format % args, inspect.stack()[2][3])
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def at_depth(depth, function):
+    """Call *function* with *depth* additional frames on the stack.
+    """
+    if depth <= 0:
+        return function()
+    return at_depth(depth - 1, function)
+
+def measure(information, depth, runs, repeat):
+    def relay():
+        start = time.time()
+        for i in xrange(repeat):
+            information.debug("Message %d", i)
+        return time.time() - start
+
+    timings = [at_depth(depth, relay) / repeat for i in xrange(runs)]
+    return median(timings)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark of the debug() caller lookup.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        informations = []
+        for (name, cls) in (("inspect", Inspect_Information),
+                ("getframe", console.Display_Information)):
+            information = cls({'debug': console.DI_LOG, 'log_filename': name + ".log"})
+            information.log_directory = directory + os.sep
+            informations.append(information)
+
+        print "%-10s %16s %16s" % ("depth", "inspect (us)", "getframe (us)")
+        for depth in (10, 50, 200):
+            timings = [measure(information, depth, args.runs, repeat)
+                    for (information, repeat) in zip(informations, (20, 20000))]
+            print "%-10d %16.1f %16.1f" % (depth, timings[0] * 1e6, timings[1] * 1e6)
+    finally:
+        console.close_log_sinks()
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Load test of Console_Server over a Unix domain socket.
+
+1. Throughput: N clients each run M short commands, one at a time per client, all clients
+   at once. Every reply is checked.
+2. Backpressure: one client starts a command printing BYTES in 8 KB steps and does not read
+   for a second. The output the server buffers for the session is sampled meanwhile and must
+   stay below *output_limit* plus one step. The client then reads the whole output.
+
+Usage:
+    python benchmark/console_server.py [--clients N] [--commands M] [--bytes BYTES]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import console
+
+OUTPUT_LIMIT = 4096
+STEP = 8192
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load test of Console_Server.")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--commands", type=int, default=20)
+    parser.add_argument("--bytes", type=int, default=8 * 1024 * 1024)
+    args = parser.parse_args()
+    sys.argv = sys.argv[:1]
+
+    server_console = console.Console()
+
+    def hello():
+        print "hello %s" % " ".join(server_console.current_command_additional_args)
+
+    def flood():
+        for i in xrange(args.bytes // STEP):
+            sys.stdout.write("x" * STEP)
+            yield
+
+    server_console.console_add_command("hello", hello, "Reply with the arguments.")
+    server_console.console_add_command("flood", flood, "Print a lot of output.")
+
+    directory = tempfile.mkdtemp()
+    address = os.path.join(directory, "console.sock")
+    server = threading.Thread(target=server_console.console_serve, args=(address,),
+            kwargs={'output_limit': OUTPUT_LIMIT})
+    server.daemon = True
+    server.start()
+    try:
+        while not os.path.exists(address):
+            time.sleep(0.01)
+
+        clients = [console.Console_Client(address) for i in xrange(args.clients)]
+        start = time.time()
+        for i in xrange(args.commands):
+            for (number, client) in enumerate(clients):
+                client.connection.sendall("hello %d %d\n" % (number, i))
+            for (number, client) in enumerate(clients):
+                assert "hello %d %d" % (number, i) in client._read_prompt()
+        elapsed = time.time() - start
+        for client in clients:
+            client.close()
+        print "throughput:   %d clients, %.0f commands/s" % (args.clients,
+                args.clients * args.commands / elapsed)
+
+        client = console.Console_Client(address)
+        client.connection.sendall("flood\n")
+        loop = server_console._console_loop
+        largest = 0
+        stop = time.time() + 1.0
+        while time.time() < stop:
+            for session in loop._sessions.values():
+                largest = max(largest, session.output_size)
+            time.sleep(0.001)
+        start = time.time()
+        output = client._read_prompt()
+        elapsed = time.time() - start
+        client.close()
+        assert output.count("x") == args.bytes // STEP * STEP, "Output lost"
+        assert largest <= OUTPUT_LIMIT + STEP, "Unbounded output buffer"
+        print "backpressure: at most %d bytes buffered (limit %d, step %d)" % (largest,
+                OUTPUT_LIMIT, STEP)
+        print "              %d bytes read by the client at %.1f MB/s" % (len(output),
+                len(output) / elapsed / 1e6)
+    finally:
+        server_console.console_stop_loop()
+        server.join(5)
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main()
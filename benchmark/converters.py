@@ -0,0 +1,69 @@
+"""Benchmark of numeric list flags: the FLAG_INPUT_FLOAT_LIST and FLAG_INPUT_INT_LIST
+converters against converting each element with float() or int() in a Python loop.
+
+Each case parses one flag with a comma separated list of N numbers. The loop cases take the
+value as FLAG_INPUT_STR and convert it the way handlers did before, with a list
+comprehension. The median of several runs is printed.
+
+Usage:
+    python benchmark/converters.py [--runs N]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import console
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def measure(function, runs, repeat):
+    timings = []
+    for i in xrange(runs):
+        start = time.time()
+        for j in xrange(repeat):
+            function()
+        timings.append((time.time() - start) / repeat)
+    return median(timings)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark of numeric list flags.")
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+    sys.argv = sys.argv[:1]
+
+    command = console.Command("train", lambda: None, "Benchmark command")
+    command.add_flag("--text", None, "", console.FLAG_INPUT_STR)
+    command.add_flag("--floats", None, "", console.FLAG_INPUT_FLOAT_LIST)
+    command.add_flag("--ints", None, "", console.FLAG_INPUT_INT_LIST)
+    line_parser = console._Console_Parser()
+
+    def loop(line, convert):
+        line_parser.parse_line(command, line)
+        return [convert(item) for item in line_parser.active_flags[0].input.split(',')]
+
+    def converter(line):
+        line_parser.parse_line(command, line)
+        return line_parser.active_flags[0].input
+
+    print "%-24s %14s %16s" % ("case", "loop (ms)", "converter (ms)")
+    for count in (1000, 10000, 100000):
+        floats = ",".join(["%.6f" % (i * 0.001) for i in xrange(count)])
+        ints = ",".join([str(i * 7) for i in xrange(count)])
+        repeat = max(1, 100000 // count)
+        cases = [
+            ("%d floats" % count, "train --text " + floats, "train --floats " + floats, float),
+            ("%d ints" % count, "train --text " + ints, "train --ints " + ints, int),
+        ]
+        for (name, loop_line, converter_line, convert) in cases:
+            assert list(loop(loop_line, convert)) == list(converter(converter_line))
+            loop_time = measure(lambda: loop(loop_line, convert), args.runs, repeat)
+            converter_time = measure(lambda: converter(converter_line), args.runs, repeat)
+            print "%-24s %14.4f %16.4f" % (name, loop_time * 1000, converter_time * 1000)
+
+if __name__ == '__main__':
+    main()
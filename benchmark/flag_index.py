@@ -0,0 +1,87 @@
+"""Benchmark of flag lookup in parse_line: the per-Command flag index against scanning the
+flag list for every token (the lookup parse_line did before Command._flag_index).
+
+Each case parses a line with 10 flags and 5 additional arguments for a command with N flags.
+The flags on the line are spread over the flag list. The median of several runs is printed.
+
+Usage:
+    python benchmark/flag_index.py [--runs N]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import console
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def measure(function, runs, repeat):
+    timings = []
+    for i in xrange(runs):
+        start = time.time()
+        for j in xrange(repeat):
+            function()
+        timings.append((time.time() - start) / repeat)
+    return median(timings)
+
+def scan_parse(command, tokens):
+    """parse_line before the flag index: every token is compared with every flag in order,
+    and a repeated flag is found by scanning the active flags.
+    """
+    active_flags = []
+    additional_args = []
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        found = None
+        for flag in command.available_flags:
+            if token == flag.longf or token == flag.shortf:
+                found = flag
+                break
+        if found is None:
+            additional_args.append(token)
+        else:
+            value = None
+            if found.input > console.FLAG_INPUT_IGNORE:
+                index += 1
+                value = tokens[index]
+            for active in active_flags:
+                if active[0] == found.longf:
+                    active_flags.remove(active)
+                    break
+            active_flags.append((found.longf, value))
+        index += 1
+    return (active_flags, additional_args)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark of flag lookup.")
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+    sys.argv = sys.argv[:1]
+
+    line_parser = console._Console_Parser()
+    print "%-10s %14s %14s" % ("flags", "scan (us)", "index (us)")
+    for count in (10, 100, 1000):
+        command = console.Command("run", lambda: None, "Benchmark command")
+        for i in xrange(count):
+            command.add_flag("--flag-%d" % i, None, "", console.FLAG_INPUT_STR)
+        tokens = []
+        for i in xrange(10):
+            tokens.extend(["--flag-%d" % (i * count // 10 + count // 20), "value"])
+        tokens.extend(["arg%d" % i for i in xrange(5)])
+
+        line_parser.parse_line(command, list(tokens), False)
+        assert ([(flag.longf, flag.input) for flag in line_parser.active_flags] ==
+                scan_parse(command, tokens)[0])
+        scan = measure(lambda: scan_parse(command, tokens), args.runs, 2000)
+        index = measure(lambda: line_parser.parse_line(command, iter(tokens), False),
+                args.runs, 2000)
+        print "%-10d %14.1f %14.1f" % (count, scan * 1e6, index * 1e6)
+
+if __name__ == '__main__':
+    main()
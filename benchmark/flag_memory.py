@@ -0,0 +1,60 @@
+"""Memory benchmark of flag specs and active flags: the __slots__ Flag and Active_Flag
+against the dictionaries used before them.
+
+tracemalloc is not available on Python 2, so the size of each object is measured with
+sys.getsizeof (the object itself, not the strings and methods it refers to, which both
+representations share). Prints the size per object and the total for a command with N
+flags that are all present on the parsed line.
+
+Usage:
+    python benchmark/flag_memory.py [--flags N]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import console
+
+def size(value):
+    """Size of *value* in bytes, including its instance dictionary if it has one.
+    """
+    total = sys.getsizeof(value)
+    if hasattr(value, '__dict__'):
+        total += sys.getsizeof(value.__dict__)
+    return total
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Memory benchmark of flags.")
+    parser.add_argument("--flags", type=int, default=1000)
+    args = parser.parse_args()
+    sys.argv = sys.argv[:1]
+
+    command = console.Command("run", lambda: None, "Benchmark command")
+    for i in xrange(args.flags):
+        command.add_flag("--flag-%d" % i, None, "Flag %d" % i, console.FLAG_INPUT_INT)
+    tokens = []
+    for i in xrange(args.flags):
+        tokens.extend(["--flag-%d" % i, str(i)])
+    line_parser = console._Console_Parser()
+    line_parser.parse_line(command, iter(tokens), False)
+
+    #The dictionaries Command.add_flag and parse_line created before
+    flag_dicts = [{'longf':flag.longf, 'shortf':flag.shortf, 'description':flag.description,
+            'input':flag.input, 'method':flag.method} for flag in command.available_flags]
+    active_dicts = [{'longf':flag.longf, 'description':flag.description, 'input':flag.input,
+            'method':flag.method} for flag in line_parser.active_flags]
+
+    rows = [("flag spec", flag_dicts, command.available_flags),
+            ("active flag", active_dicts, line_parser.active_flags)]
+    print "%-14s %12s %12s %14s %14s" % ("object", "dict (B)", "slots (B)",
+            "dict total", "slots total")
+    for (name, dicts, objects) in rows:
+        dict_sizes = [size(value) for value in dicts]
+        object_sizes = [size(value) for value in objects]
+        print "%-14s %12d %12d %14d %14d" % (name, dict_sizes[0], object_sizes[0],
+                sum(dict_sizes), sum(object_sizes))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark of logfile output: the buffered Log_Sink against opening, appending to and
+closing the logfile for every message (the path Display_Information used before Log_Sink).
+
+Each case relays N verbose() messages to a logfile in a temporary directory and flushes.
+The median of several runs is printed as messages per second.
+
+Usage:
+    python benchmark/log_sink.py [--messages N] [--runs N]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import console
+
+class Append_Information(console.Display_Information):
+    """Relays messages like Display_Information did before Log_Sink.
+    """
+    def _assistant_information_relay(self, record, DI_level):
+        with open(self.log_directory + self.log_filename, "a") as f:
+            f.write(record.text())
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def measure(cls, directory, messages, runs):
+    rates = []
+    for i in xrange(runs):
+        information = cls({'verbose': console.DI_LOG, 'log_filename': "run%d.log" % i})
+        information.log_directory = directory + os.sep
+        start = time.time()
+        for j in xrange(messages):
+            information.verbose("Message %d of the benchmark run", j)
+        information.log_flush()
+        rates.append(messages / (time.time() - start))
+        with open(os.path.join(directory, "run%d.log" % i)) as f:
+            assert sum(1 for line in f) == messages
+    return median(rates)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark of logfile output.")
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    for name in ("append", "sink"):
+        os.mkdir(os.path.join(directory, name))
+    try:
+        append = measure(Append_Information, os.path.join(directory, "append"),
+                args.messages, args.runs)
+        sink = measure(console.Display_Information, os.path.join(directory, "sink"),
+                args.messages, args.runs)
+    finally:
+        console.close_log_sinks()
+        shutil.rmtree(directory)
+    print "%-24s %14s" % ("path", "messages/s")
+    print "%-24s %14.0f" % ("open/append/close", append)
+    print "%-24s %14.0f" % ("Log_Sink", sink)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Stress test of one logfile shared by many threads.
+
+N threads relay debug() messages to the same Log_Sink. Afterwards every line of the logfile
+is checked: it must be whole, and the lines of each thread must appear complete and in the
+order they were relayed. Prints throughput, the number of stripes in use and the number of
+writes to the file.
+
+Usage:
+    python benchmark/log_threads.py [--threads N] [--messages N]
+"""
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import console
+
+LINE = re.compile(r"^\[worker-(\d+): \(relay\)\]: message (\d+) of worker \1 [x]{40}$")
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stress test of a shared logfile.")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        information = console.Display_Information({'debug': console.DI_LOG,
+                'log_filename': "stress.log"})
+        information.log_directory = directory + os.sep
+        information.debug("start")
+        information.log_flush()
+        sink = information._log_sink
+        writes = [0]
+        write_buffer = sink._write_buffer
+        def counting_write_buffer(*args, **kwargs):
+            writes[0] += 1
+            write_buffer(*args, **kwargs)
+        sink._write_buffer = counting_write_buffer
+
+        padding = "x" * 40
+        barrier = threading.Event()
+        stripes = set()
+        def relay(worker):
+            barrier.wait()
+            for i in xrange(args.messages):
+                information.debug("message %d of worker %d %s", i, worker, padding)
+            stripes.add(id(sink._stripe()))
+
+        threads = [threading.Thread(target=relay, args=(worker,), name="worker-%d" % worker)
+                for worker in xrange(args.threads)]
+        for thread in threads:
+            thread.start()
+        start = time.time()
+        barrier.set()
+        for thread in threads:
+            thread.join()
+        information.log_flush()
+        elapsed = time.time() - start
+
+        expected = [0] * args.threads
+        with open(os.path.join(directory, "stress.log")) as f:
+            assert next(f).endswith("start\n")
+            for line in f:
+                match = LINE.match(line.rstrip("\n"))
+                assert match is not None, "Torn line: %r" % line
+                (worker, number) = (int(match.group(1)), int(match.group(2)))
+                assert number == expected[worker], "Line out of order: %r" % line
+                expected[worker] += 1
+        assert expected == [args.messages] * args.threads, "Lines missing"
+    finally:
+        console.close_log_sinks()
+        shutil.rmtree(directory)
+
+    total = args.threads * args.messages
+    print "%d lines from %d threads intact and in order" % (total, args.threads)
+    print "throughput:     %.0f messages/s" % (total / elapsed)
+    print "stripes in use: %d of %d" % (len(stripes), console.DI_LOG_STRIPES)
+    print "writes to file: %d (%.0f lines per write)" % (writes[0], total / float(writes[0]))
+
+if __name__ == '__main__':
+    main()
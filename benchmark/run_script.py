@@ -0,0 +1,129 @@
+"""Batch execution benchmark of the in-program console.
+
+Runs the same N commands through *console_run_script* and through the interactive loop of
+*console_start*, fed by a pipe and by a pseudo terminal like a provisioning script piping
+into the program would. The interactive runs happen in a forked child; the time of a run
+with no commands (startup and exit) is subtracted, so only the per command cost is compared.
+Prints the milliseconds per 1000 commands of each path and the ratio to
+*console_run_script*.
+
+Usage:
+    python benchmark/run_script.py [--commands N] [--runs N]
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import console
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def make_console():
+    """Returns a Console with one command taking a flag, the commands of the benchmark.
+    """
+    program = console.Console(disable_default_flags=True)
+    command = program.console_add_command("set", lambda: None, "Set a value.")
+    command.add_flag("value", "v", "The value.", console.FLAG_INPUT_INT, lambda: None)
+    return program
+
+def script_lines(commands):
+    return ["set --value %d" % i for i in xrange(commands)]
+
+def time_script(commands):
+    """Returns the seconds *console_run_script* takes for *commands* commands.
+    """
+    program = make_console()
+    lines = script_lines(commands)
+    saved = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        start = time.time()
+        report = program.console_run_script(lines)
+        elapsed = time.time() - start
+    finally:
+        sys.stdout.close()
+        sys.stdout = saved
+    assert len(report) == commands and all([error is None for (n, l, s, error) in report])
+    return elapsed
+
+def time_interactive(commands, use_pty):
+    """Returns the seconds from starting a child running *console_start* until it exits
+    after reading *commands* commands and *exit* from a pipe or a pseudo terminal.
+    """
+    import pty
+
+    data = "".join([line + "\n" for line in script_lines(commands)]) + "exit\n"
+    start = time.time()
+    if use_pty:
+        (pid, fd) = pty.fork()
+        (read_fd, write_fd) = (fd, fd)
+    else:
+        (stdin_read, write_fd) = os.pipe()
+        (read_fd, stdout_write) = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.dup2(stdin_read, 0)
+            os.dup2(stdout_write, 1)
+            for fd in (stdin_read, write_fd, read_fd, stdout_write):
+                os.close(fd)
+    if pid == 0:
+        try:
+            sys.stdin = os.fdopen(0, "r")
+            sys.stdout = os.fdopen(1, "w")
+            make_console().console_start(False)
+        finally:
+            os._exit(0)
+    if not use_pty:
+        os.close(stdin_read)
+        os.close(stdout_write)
+
+    def feed():
+        view = data
+        while view:
+            view = view[os.write(write_fd, view[:4096]):]
+        if not use_pty:
+            os.close(write_fd)
+    feeder = threading.Thread(target=feed)
+    feeder.daemon = True
+    feeder.start()
+    while True:
+        try:
+            if not os.read(read_fd, 65536):
+                break
+        except OSError:
+            #The pseudo terminal reports EIO once the child has exited
+            break
+    os.waitpid(pid, 0)
+    elapsed = time.time() - start
+    feeder.join()
+    os.close(read_fd)
+    return elapsed
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Batch execution benchmark of the console.")
+    parser.add_argument("--commands", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    sys.argv = sys.argv[:1]
+
+    script = median([time_script(args.commands) for i in xrange(args.runs)])
+    results = [("console_run_script", script)]
+    for (name, use_pty) in (("interactive, pipe", False), ("interactive, terminal", True)):
+        empty = median([time_interactive(0, use_pty) for i in xrange(args.runs)])
+        full = median([time_interactive(args.commands, use_pty) for i in xrange(args.runs)])
+        results.append((name, max(full - empty, 0.0)))
+
+    print "%d commands, median of %d runs" % (args.commands, args.runs)
+    print "%-24s %14s %10s" % ("path", "ms/1000 cmds", "ratio")
+    for (name, elapsed) in results:
+        print "%-24s %14.2f %9.1fx" % (name, elapsed * 1000000.0 / args.commands,
+                elapsed / script)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Shutdown latency of the threaded in-program console.
+
+Starts the console with *console_start* while STDIN is idle, sets the returned shutdown
+event and measures the time until the console thread has terminated. STDIN is either a
+pipe or a pseudo terminal, which takes the terminal (cbreak) wait path. Exits with status 1
+if the slowest shutdown exceeds the limit.
+
+Usage:
+    python benchmark/shutdown.py [--runs N] [--max-ms MS]
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import console
+
+def measure(stdin_fd, runs):
+    """Returns the shutdown latencies (seconds) of *runs* consoles reading *stdin_fd*.
+    """
+    saved = (sys.stdin, sys.stdout)
+    sys.stdin = os.fdopen(os.dup(stdin_fd), "r")
+    sys.stdout = open(os.devnull, "w")
+    program = console.Console(disable_default_flags=True)
+    latencies = []
+    try:
+        for i in xrange(runs):
+            shutdown = program.console_start(True, False)
+            time.sleep(0.02)
+            threads = [t for t in threading.enumerate() if isinstance(t, console.Console_Program)]
+            start = time.time()
+            shutdown.set()
+            for thread in threads:
+                thread.join()
+            latencies.append(time.time() - start)
+    finally:
+        sys.stdin.close()
+        sys.stdout.close()
+        (sys.stdin, sys.stdout) = saved
+    return latencies
+
+def main():
+    import argparse
+    import pty
+
+    parser = argparse.ArgumentParser(description="Shutdown latency of the console.")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--max-ms", type=float, default=50.0)
+    args = parser.parse_args()
+    sys.argv = sys.argv[:1]
+
+    (pipe_read, pipe_write) = os.pipe()
+    (pty_master, pty_slave) = pty.openpty()
+    failed = False
+    for (name, fd) in (("pipe", pipe_read), ("terminal", pty_slave)):
+        latencies = sorted(measure(fd, args.runs))
+        slowest = latencies[-1] * 1000
+        print "%-9s median %7.3f ms   max %7.3f ms" % (name,
+                latencies[len(latencies) // 2] * 1000, slowest)
+        if slowest > args.max_ms:
+            print "FAIL: %s shutdown exceeds %.1f ms" % (name, args.max_ms)
+            failed = True
+    for fd in (pipe_read, pipe_write, pty_master, pty_slave):
+        os.close(fd)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Startup benchmark of the console module.
+
+Measures, as the median of several runs:
+    - import: time to import the console module in a fresh interpreter, less the time of
+      an interpreter doing nothing.
+    - construct: time to construct a Console with 200 terminal flags and 200 commands
+      holding one flag each.
+
+Construction must not create the log directory or probe the terminal. The benchmark exits
+with status 1 if it does, or if a median exceeds its limit, so it can guard against startup
+regressions. On Python 3.7+ a per module breakdown is available with
+*python -X importtime -c "import console"*.
+
+Usage:
+    python benchmark/startup.py [--runs N] [--max-import-ms MS] [--max-construct-ms MS]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+NUM_FLAGS = 200
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def time_import(runs):
+    """Returns the median milliseconds spent importing console in a fresh interpreter.
+    """
+    #Like an installed module, import from bytecode written by a first run
+    environment = dict(os.environ)
+    environment.pop("PYTHONDONTWRITEBYTECODE", None)
+    def run(code):
+        start = time.time()
+        subprocess.check_call([sys.executable, "-c", code], cwd=SRC_DIRECTORY,
+                env=environment)
+        return time.time() - start
+
+    run("import console")
+
+    baseline = median([run("pass") for i in xrange(runs)])
+    return (median([run("import console") for i in xrange(runs)]) - baseline) * 1000
+
+def time_construct(runs):
+    """Returns the median milliseconds spent constructing the Console.
+    """
+    sys.path.insert(0, SRC_DIRECTORY)
+    import console
+
+    class Program(console.Console):
+        def terminal_init(self):
+            for i in xrange(NUM_FLAGS):
+                self.terminal_add_flag("--flag-%d" % i, description="Flag number %d" % i,
+                        input=console.FLAG_INPUT_INT)
+
+    probes = []
+    original_terminal_size = console.Terminal_Size.__init__
+    def counting_terminal_size(self):
+        probes.append(1)
+        original_terminal_size(self)
+    console.Terminal_Size.__init__ = counting_terminal_size
+
+    timings = []
+    for i in xrange(runs):
+        start = time.time()
+        program = Program()
+        for j in xrange(NUM_FLAGS):
+            command = program.console_add_command("command%d" % j, program._dummy,
+                    "Command number %d" % j)
+            command.add_flag("--value", "v", "Value of the command", console.FLAG_INPUT_STR)
+        timings.append(time.time() - start)
+
+    console.Terminal_Size.__init__ = original_terminal_size
+    return (median(timings) * 1000, len(probes))
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Startup benchmark of the console module.")
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-construct-ms", type=float, default=None)
+    args = parser.parse_args()
+    #Console parses sys.argv, hide the benchmark arguments from it
+    sys.argv = sys.argv[:1]
+
+    import_ms = time_import(args.runs)
+    working_directory = tempfile.mkdtemp()
+    os.chdir(working_directory)
+    (construct_ms, probes) = time_construct(args.runs)
+    created = os.listdir(working_directory)
+    if not created:
+        os.rmdir(working_directory)
+
+    failed = False
+    print "import:    %7.2f ms" % import_ms
+    print "construct: %7.2f ms (%d flags, %d commands)" % (construct_ms, NUM_FLAGS, NUM_FLAGS)
+    if probes:
+        print "FAIL: construction probed the terminal size %d times" % probes
+        failed = True
+    if created:
+        print "FAIL: construction created %s in the working directory" % ", ".join(created)
+        failed = True
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print "FAIL: import exceeds %.2f ms" % args.max_import_ms
+        failed = True
+    if args.max_construct_ms is not None and construct_ms > args.max_construct_ms:
+        print "FAIL: construct exceeds %.2f ms" % args.max_construct_ms
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Benchmark of console line parsing: the tokenizing generator against str.split().
+
+Each case parses a line for a command with 20 flags, either tokenized by
+*tokenize_line* (the console path) or split with str.split() and passed as a list (the
+previous path, which does not support quoting and gives wrong tokens for the quoted cases).
+The median of several runs is printed.
+
+Usage:
+    python benchmark/tokenizer.py [--runs N]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import console
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def measure(function, runs, repeat):
+    timings = []
+    for i in xrange(runs):
+        start = time.time()
+        for j in xrange(repeat):
+            function()
+        timings.append((time.time() - start) / repeat)
+    return median(timings)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark of console line parsing.")
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+    sys.argv = sys.argv[:1]
+
+    command = console.Command("deploy", lambda: None, "Benchmark command")
+    for i in xrange(20):
+        command.add_flag("--flag-%d" % i, None, "", console.FLAG_INPUT_STR)
+    line_parser = console._Console_Parser()
+
+    payload = "x" * (4 * 1024 * 1024)
+    cases = [
+        ("typical line (12 tokens)", "deploy --flag-1 a --flag-2 b c d e f --flag-3 g h", 20000),
+        ("pasted line (20000 tokens)", "deploy " + " ".join(["arg%d" % i for i in xrange(20000)]),
+                20),
+        ("4 MB argument", "deploy --flag-1 " + payload, 20),
+        #str.split() does not remove the quotes or keep quoted spaces, timed for reference
+        ("quoted line (5000 tokens)", "deploy " + " ".join(['"arg %d"' % i for i in xrange(5000)]),
+                20),
+        ("4 MB quoted argument", 'deploy --flag-1 "' + payload + '"', 20),
+    ]
+    print "%-28s %14s %14s" % ("case", "split (ms)", "tokenize (ms)")
+    for (name, line, repeat) in cases:
+        split = measure(lambda: line_parser.parse_line(command, line.split()), args.runs,
+                repeat)
+        tokenize = measure(lambda: line_parser.parse_line(command, line), args.runs, repeat)
+        print "%-28s %14.4f %14.4f" % (name, split * 1000, tokenize * 1000)
+
+if __name__ == '__main__':
+    main()
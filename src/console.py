@@ -9,6 +9,7 @@
 import errno
 import time
 import threading
+import types
 
 #Flag definitions for Display_Information
 DI_IGNORE = 0
@@ -22,16 +23,77 @@ DI_CONSOLE_INHERIT = 1
 DI_MIN_FLAG_LEVEL = DI_IGNORE
 DI_MAX_FLAG_LEVEL = DI_STDOUT_LOG
 
+#Default settings for the logfile sink shared by Display_Information instances
+DI_LOG_DIRECTORY = "logs/"
+DI_LOG_BUFFER_SIZE = 8192
+DI_LOG_FLUSH_INTERVAL = 1.0
+DI_LOG_STRIPES = 16
+
+#Logfile rotation is disabled by default
+DI_LOG_ROTATE_SIZE = 0
+DI_LOG_ROTATE_INTERVAL = 0
+DI_LOG_ROTATE_KEEP = 0
+
+#Overflow policies for the asynchronous Log_Writer queue
+DI_QUEUE_BLOCK = 0
+DI_QUEUE_DROP_OLDEST = 1
+DI_QUEUE_DROP_NEWEST = 2
+DI_LOG_QUEUE_SIZE = 10000
+
+#Logfile record formats
+DI_FORMAT_TEXT = 0
+DI_FORMAT_JSON = 1
+
+#Bit per Display_Information setting, used by the JSON logfile index
+_DI_LEVEL_BITS = {'verbose':1, 'debug':2, 'verbosedebug':4}
+
 
 FLAG_INPUT_IGNORE = 0
 FLAG_INPUT_STR = 1
 FLAG_INPUT_INT = 2
 FLAG_INPUT_FLOAT = 3
+FLAG_INPUT_INT_LIST = 4
+FLAG_INPUT_FLOAT_LIST = 5
+FLAG_INPUT_RANGE = 6
+FLAG_INPUT_BYTES = 7
+FLAG_INPUT_DURATION = 8
+
+#In-program console and Console_Server settings
+CONSOLE_PROMPT = "\n # "
+CONSOLE_SERVER_MAX_CONCURRENT = 64
+CONSOLE_SERVER_MAX_SESSIONS = 1024
+CONSOLE_SERVER_OUTPUT_LIMIT = 65536
+CONSOLE_SERVER_LINE_LIMIT = 65536
+CONSOLE_HISTORY_LENGTH = 1000
+
+#Where console commands run, see Console.console_add_command
+COMMAND_RUN_INLINE = 0
+COMMAND_RUN_THREAD = 1
+COMMAND_RUN_PROCESS = 2
+
+#Console job pool
+CONSOLE_JOB_WORKERS = 4
+CONSOLE_JOB_QUEUE_SIZE = 64
+CONSOLE_JOB_HISTORY = 100
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
 
 STR_FLAG_INPUT_IGNORE = "ignore"
 STR_FLAG_INPUT_STR = "str"
 STR_FLAG_INPUT_INT = "int"
 STR_FLAG_INPUT_FLOAT = "float"
+STR_FLAG_INPUT_INT_LIST = "int_list"
+STR_FLAG_INPUT_FLOAT_LIST = "float_list"
+STR_FLAG_INPUT_RANGE = "range"
+STR_FLAG_INPUT_BYTES = "bytes"
+STR_FLAG_INPUT_DURATION = "duration"
+
+#Format of the tables returned by compile_flag_schema
+FLAG_TABLE_VERSION = 2
 
 class InputError(Exception):
     """Exception raised when terminal input does not match expected input,
@@ -49,6 +111,886 @@ class CallError(Exception):
         msg = message % args
         Exception.__init__(self, msg)
 
+class Log_Record(object):
+    """A single message relayed by :class:`Display_Information`.
+
+    Attributes:
+        - self.time (float): Time the message was relayed, seconds since the epoch.
+        - self.level (str): Setting that relayed the message, *'verbose'*, *'debug'* or
+          *'verbosedebug'*.
+        - self.thread (str): Name of the relaying thread.
+        - self.caller (str): Name of the method that relayed the message, None if unknown.
+        - self.message (str): The formatted message without trailing newline.
+    """
+    __slots__ = ('time', 'level', 'thread', 'caller', 'message')
+
+    def __init__(self, level, message, caller=None):
+        self.time = time.time()
+        self.level = level
+        self.thread = threading.current_thread().name
+        self.caller = caller
+        self.message = message
+
+    def text(self):
+        """Returns the record as a line of text (str, unicode messages are UTF-8 encoded).
+        **'verbose'** messages are written as is, debug messages are prefixed with thread and
+        calling method.
+        """
+        if self.level == 'verbose':
+            line = "%s\n" % self.message
+        elif self.caller is None:
+            line = "[%s]: %s\n" % (self.thread, self.message)
+        else:
+            line = "[%s: (%s)]: %s\n" % (self.thread, self.caller, self.message)
+        if isinstance(line, unicode):
+            line = line.encode("utf-8")
+        return line
+
+    def json(self):
+        """Returns the record as a line of JSON. Bytes of the message and thread name that are
+        not valid UTF-8 are replaced by U+FFFD.
+        """
+        import json
+
+        message = self.message
+        if isinstance(message, str):
+            message = message.decode("utf-8", "replace")
+        thread = self.thread
+        if isinstance(thread, str):
+            thread = thread.decode("utf-8", "replace")
+        return json.dumps({'time':self.time, 'level':self.level, 'thread':thread,
+                'caller':self.caller, 'message':message}, separators=(',', ':')) + "\n"
+
+class _Log_Stripe(object):
+    """One lock protected slice of a :class:`Log_Sink` buffer.
+    """
+    __slots__ = ('lock', 'buffer')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buffer = []
+
+class Log_Sink(object):
+    """Buffered writer keeping one logfile open for the lifetime of the process.
+
+    Messages are formatted as they arrive and the lines collected in memory. A full buffer
+    (more than *buffer_size* bytes) is written by a background thread of the sink, and a timer
+    writes messages that have been buffered for *flush_interval* seconds, so relaying a message
+    does not touch the file. Only if the background thread falls several buffers behind does
+    the relaying thread write the buffer itself. :meth:`flush` and :meth:`close` write in the
+    calling thread. All sinks are flushed and closed when the interpreter exits. An error writing in
+    the background is raised by the next call to :meth:`write`, :meth:`write_batch` or
+    :meth:`flush`.
+
+    The sink is thread safe. The buffer is split in *stripes*, each with its own lock, and a
+    writing thread only locks its own stripe, assigned round-robin on its first write. Every
+    message is a whole line and carries a sequence number, so lines are written to file in the
+    order they were relayed and never interleave.
+
+    With *record_format* **DI_FORMAT_JSON** every record is written as one line of JSON
+    holding time, level, thread, caller and message. Each written block is also recorded in a
+    sidecar index *path.idx*, which :class:`Log_Reader` uses to seek directly to the blocks
+    matching a query.
+
+    The logfile can be rotated when it grows beyond *rotate_size* bytes or has been written to
+    for *rotate_interval* seconds. The current file is then renamed to *path.YYYYmmdd-HHMMSS.N*,
+    where *N* counts the segments, and a new file is started at *path*. Rotation happens when
+    the buffer is written by the background thread, the timer, :meth:`flush` or :meth:`close`,
+    never by a relaying thread, and rotated segments are optionally gzipped by another background thread. Segments left by earlier
+    runs are counted against *rotate_keep* when the logfile is opened.
+
+    Sinks are shared per path, retrieve them with :func:`get_log_sink` rather than creating
+    them directly.
+    """
+    def __init__(self, path, buffer_size=DI_LOG_BUFFER_SIZE, flush_interval=DI_LOG_FLUSH_INTERVAL,
+            stripes=DI_LOG_STRIPES, rotate_size=DI_LOG_ROTATE_SIZE,
+            rotate_interval=DI_LOG_ROTATE_INTERVAL, rotate_compress=False,
+            rotate_keep=DI_LOG_ROTATE_KEEP, record_format=DI_FORMAT_TEXT):
+        """
+        Args:
+            - path (str): Full path of the logfile. The file is opened for append on first write.
+
+        Kwargs:
+            - buffer_size (int): Number of buffered bytes that triggers a write to file.
+              0 hands every message to the background thread immediately.
+            - flush_interval (float): Maximum number of seconds a message stays in the buffer.
+              0 disables the time based flush.
+            - stripes (int): Number of independently locked buffers.
+            - rotate_size (int): Rotate the logfile when it exceeds this many bytes.
+              0 disables size based rotation.
+            - rotate_interval (float): Rotate the logfile after this many seconds.
+              0 disables time based rotation.
+            - rotate_compress (bool): gzip rotated segments in a background thread.
+            - rotate_keep (int): Number of rotated segments to keep, older segments are
+              deleted. 0 keeps all segments.
+            - record_format (int): **DI_FORMAT_TEXT** or **DI_FORMAT_JSON**.
+
+        Raises:
+            TypeError
+        """
+        import itertools
+
+        if not isinstance(buffer_size, int) or buffer_size < 0:
+            raise TypeError("'buffer_size' argument must be a non-negative 'int'")
+        if not isinstance(flush_interval, (int, float)) or flush_interval < 0:
+            raise TypeError("'flush_interval' argument must be a non-negative number")
+        if not isinstance(stripes, int) or stripes <= 0:
+            raise TypeError("'stripes' argument must be a positive 'int'")
+        if not isinstance(rotate_size, int) or rotate_size < 0:
+            raise TypeError("'rotate_size' argument must be a non-negative 'int'")
+        if not isinstance(rotate_interval, (int, float)) or rotate_interval < 0:
+            raise TypeError("'rotate_interval' argument must be a non-negative number")
+        if not isinstance(rotate_keep, int) or rotate_keep < 0:
+            raise TypeError("'rotate_keep' argument must be a non-negative 'int'")
+        if record_format not in (DI_FORMAT_TEXT, DI_FORMAT_JSON):
+            raise AttributeError("Unknown record format '%s'." % str(record_format))
+
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._file = None
+        self._timer = None
+        #Background thread writing full buffers, started on the first full buffer
+        self._flusher = None
+        self._flush_requested = False
+        self._error = None
+        #Bytes buffered before a relaying thread waits for the background thread
+        self._backlog_size = 4 * max(buffer_size, DI_LOG_BUFFER_SIZE)
+        #Guards the timer and the flusher state, never held during file access
+        self._cond = threading.Condition(threading.Lock())
+        self._stripes = [_Log_Stripe() for x in xrange(stripes)]
+        #Stripe of each writing thread, see _stripe
+        self._local = threading.local()
+        self._stripe_counter = itertools.count()
+        self._sequence = itertools.count()
+        #Bytes in all stripes, decides when the buffer is written
+        self._buffered = 0
+        #Serializes file access, taken before any stripe lock
+        self._lock = threading.Lock()
+
+        self.rotate_size = rotate_size
+        self.rotate_interval = rotate_interval
+        self.rotate_compress = rotate_compress
+        self.rotate_keep = rotate_keep
+        self._file_size = 0
+        self._rotate_at = None
+        self._segments = []
+        self._segments_scanned = False
+        self._segment_count = 0
+        self._compressors = []
+
+        self.record_format = record_format
+        self._index_file = None
+
+    def write(self, record):
+        """Append the :class:`Log_Record` *record* to the buffer, writing the buffer to file if
+        it is full.
+
+        Raises:
+            IOError, OSError
+        """
+        self.write_batch((record,))
+
+    def write_batch(self, records):
+        """Append a sequence of :class:`Log_Record` objects to the buffer in order.
+
+        Raises:
+            IOError, OSError
+        """
+        if self.record_format == DI_FORMAT_JSON:
+            lines = [record.json() for record in records]
+        else:
+            lines = [record.text() for record in records]
+        size = 0
+        for line in lines:
+            size += len(line)
+        stripe = self._stripe()
+        with stripe.lock:
+            for (line, record) in zip(lines, records):
+                stripe.buffer.append((next(self._sequence), line, record))
+        #Updated without a lock: a lost update only delays the write until the next message
+        #or the flush timer
+        self._buffered += size
+
+        if self._buffered >= self.buffer_size:
+            self._request_flush()
+        elif self._timer is None and self.flush_interval > 0:
+            with self._cond:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        self._raise_error()
+
+    def _request_flush(self):
+        """Wake the background thread to write the buffer, starting it if it is not running.
+        If more than *self._backlog_size* bytes are buffered the background thread is behind,
+        and the buffer is written in the calling thread instead, without rotating the logfile.
+
+        Raises:
+            IOError, OSError
+        """
+        if self._flush_requested and self._buffered <= self._backlog_size:
+            #The background thread is writing or about to
+            return
+        with self._cond:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_loop, name="Log_Sink-flush")
+                self._flusher.daemon = True
+                self._flusher.start()
+            self._flush_requested = True
+            self._cond.notify_all()
+        if self._buffered > self._backlog_size:
+            with self._lock:
+                self._write_buffer(rotate=False)
+
+    def _flush_loop(self):
+        """Background thread writing the buffer whenever :meth:`_request_flush` asks for it,
+        and again as long as the buffer filled up during the previous write.
+        """
+        while True:
+            with self._cond:
+                while not self._flush_requested:
+                    self._cond.wait()
+            try:
+                with self._lock:
+                    self._write_buffer()
+            except Exception as exception:
+                self._error = exception
+            with self._cond:
+                self._flush_requested = self._buffered >= max(self.buffer_size, 1)
+                self._cond.notify_all()
+
+    def _raise_error(self):
+        """Raise the latest error of a background write, if any, once.
+        """
+        error = self._error
+        if error is not None:
+            self._error = None
+            raise error
+
+    def _stripe(self):
+        """Returns the :class:`_Log_Stripe` of the calling thread. Threads are spread over the
+        stripes round-robin in order of their first write. Thread ids are not used, they are
+        aligned addresses and would map most threads to the same stripe.
+        """
+        stripe = getattr(self._local, 'stripe', None)
+        if stripe is None:
+            stripe = self._stripes[next(self._stripe_counter) % len(self._stripes)]
+            self._local.stripe = stripe
+        return stripe
+
+    def flush(self):
+        """Write all buffered messages to the logfile.
+
+        Raises:
+            IOError, OSError
+        """
+        with self._lock:
+            self._write_buffer()
+        self._raise_error()
+
+    def close(self):
+        """Flush the buffer and close the logfile. A later write reopens the file.
+        """
+        with self._cond:
+            timer = self._timer
+            self._timer = None
+        with self._lock:
+            self._write_buffer()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._index_file is not None:
+                self._index_file.close()
+                self._index_file = None
+            compressors = self._compressors
+            self._compressors = []
+        if timer is not None:
+            timer.cancel()
+            timer.join()
+        for compressor in compressors:
+            compressor.join()
+
+    def _timed_flush(self):
+        """Timer callback, writes the buffer at most *flush_interval* after the first message.
+        """
+        with self._cond:
+            self._timer = None
+        try:
+            with self._lock:
+                self._write_buffer()
+        except Exception as exception:
+            self._error = exception
+
+    def _write_buffer(self, rotate=True):
+        """Collect all stripes and write them to file in sequence order. Caller must hold
+        self._lock. With *rotate* False a due rotation is left to the next write.
+        """
+        records = []
+        self._buffered = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                if stripe.buffer:
+                    records.extend(stripe.buffer)
+                    stripe.buffer = []
+        if not records:
+            return
+        #Each stripe is already ordered, sort merges the runs
+        records.sort()
+        data = "".join([line for (sequence, line, record) in records])
+
+        if rotate and self._file is not None and self._file_size > 0:
+            if ((self.rotate_size and self._file_size + len(data) > self.rotate_size) or
+                    (self._rotate_at is not None and time.time() >= self._rotate_at)):
+                self._rotate()
+        if self._file is None:
+            self._open()
+        offset = self._file_size
+        self._file.write(data)
+        self._file.flush()
+        self._file_size += len(data)
+
+        if self.record_format == DI_FORMAT_JSON:
+            self._write_index([record for (sequence, line, record) in records], offset,
+                    len(data))
+
+    def _write_index(self, records, offset, length):
+        """Append an entry for the block just written to the sidecar index. Caller must hold
+        self._lock.
+        """
+        import json
+
+        levels = 0
+        threads = set()
+        for record in records:
+            levels |= _DI_LEVEL_BITS.get(record.level, 0)
+            threads.add(record.thread)
+        times = [record.time for record in records]
+        entry = {'start':min(times), 'end':max(times), 'offset':offset, 'length':length,
+                'levels':levels, 'threads':sorted(threads)}
+        if self._index_file is None:
+            self._index_file = open(self.path + ".idx", "a")
+        self._index_file.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        self._index_file.flush()
+
+    def _open(self):
+        """Open the logfile for append, creating its directory on first use. Caller must hold
+        self._lock.
+        """
+        import os
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError as exception:
+                if exception.errno != errno.EEXIST:
+                    raise
+        self._file = open(self.path, "a")
+        self._file_size = os.fstat(self._file.fileno()).st_size
+        if self.rotate_interval:
+            self._rotate_at = time.time() + self.rotate_interval
+        if self.rotate_keep and not self._segments_scanned:
+            self._segments_scanned = True
+            self._scan_segments()
+
+    def _scan_segments(self):
+        """Add the segments rotated by earlier runs to the retention list, oldest first, and
+        delete those beyond *rotate_keep*. Caller must hold self._lock.
+        """
+        import os
+        import re
+
+        directory = os.path.dirname(self.path)
+        name = os.path.basename(self.path)
+        pattern = re.compile(re.escape(name) + r"\.(\d{8}-\d{6})\.(\d+)(?:\.gz)?$")
+        found = {}
+        for filename in os.listdir(directory or os.curdir):
+            match = pattern.match(filename)
+            if match is not None:
+                segment = os.path.join(directory, filename[:match.end(2)])
+                found[segment] = (match.group(1), int(match.group(2)))
+        older = sorted(found, key=found.get)
+        self._segments = [segment for segment in older if segment not in self._segments] + \
+                self._segments
+        while len(self._segments) > self.rotate_keep:
+            _remove_log_segment(self._segments.pop(0))
+
+    def _rotate(self):
+        """Close the logfile and rename it to a timestamped segment. Caller must hold
+        self._lock.
+        """
+        import os
+
+        self._file.close()
+        self._file = None
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+        while True:
+            self._segment_count += 1
+            segment = "%s.%s.%d" % (self.path, time.strftime("%Y%m%d-%H%M%S"),
+                    self._segment_count)
+            if not os.path.exists(segment) and not os.path.exists(segment + ".gz"):
+                break
+        os.rename(self.path, segment)
+        if os.path.exists(self.path + ".idx"):
+            os.rename(self.path + ".idx", segment + ".idx")
+        self._segments.append(segment)
+
+        if self.rotate_compress:
+            self._compressors = [c for c in self._compressors if c.is_alive()]
+            compressor = threading.Thread(target=self._compress, args=(segment,),
+                    name="Log_Sink-gzip")
+            compressor.daemon = True
+            compressor.start()
+            self._compressors.append(compressor)
+
+        if self.rotate_keep:
+            while len(self._segments) > self.rotate_keep:
+                _remove_log_segment(self._segments.pop(0))
+
+    def _reset_after_fork(self):
+        """Internal. Called in a forked child, see :func:`_after_fork`. Drops the records the
+        parent buffered, the parent writes them, and the state of the parent's timer and
+        background threads. The child never rotates the logfile, it belongs to the parent.
+        """
+        for stripe in self._stripes:
+            stripe.buffer = []
+        self._buffered = 0
+        self._timer = None
+        self._flusher = None
+        self._flush_requested = False
+        self._error = None
+        self._compressors = []
+        self.rotate_size = 0
+        self.rotate_interval = 0
+        self._rotate_at = None
+
+    def _compress(self, segment):
+        """gzip a rotated segment and remove the uncompressed file. Runs in its own thread.
+        """
+        import gzip
+        import os
+        import shutil
+
+        try:
+            with open(segment, "rb") as source:
+                with gzip.open(segment + ".gz.tmp", "wb") as target:
+                    shutil.copyfileobj(source, target)
+            os.rename(segment + ".gz.tmp", segment + ".gz")
+            os.remove(segment)
+        except (IOError, OSError):
+            #Segment was removed by the retention limit while compressing
+            _remove_log_segment(segment + ".gz.tmp")
+            return
+        with self._lock:
+            if segment not in self._segments:
+                _remove_log_segment(segment)
+
+def _remove_log_segment(segment):
+    """Delete a rotated logfile segment, whether or not it has been compressed, and its index.
+    """
+    import os
+
+    for path in (segment, segment + ".gz", segment + ".idx"):
+        try:
+            os.remove(path)
+        except OSError as exception:
+            if exception.errno != errno.ENOENT:
+                raise
+
+_log_sinks = {}
+_log_sinks_lock = threading.Lock()
+
+def get_log_sink(path, buffer_size=DI_LOG_BUFFER_SIZE, flush_interval=DI_LOG_FLUSH_INTERVAL,
+        **options):
+    """Return the :class:`Log_Sink` for *path*, creating it if it does not exist. All
+    :class:`Display_Information` instances logging to the same file share one sink. The buffer
+    settings and *options* (further keyword arguments of :class:`Log_Sink`) are only applied
+    when the sink is created.
+    """
+    import os
+
+    path = os.path.abspath(path)
+    with _log_sinks_lock:
+        sink = _log_sinks.get(path)
+        if sink is None:
+            if not _log_sinks:
+                import atexit
+                atexit.register(close_log_sinks)
+            sink = Log_Sink(path, buffer_size, flush_interval, **options)
+            _log_sinks[path] = sink
+        return sink
+
+def flush_log_sinks():
+    """Write the buffered messages of all open logfiles to disk.
+    """
+    with _log_sinks_lock:
+        sinks = _log_sinks.values()
+    for sink in sinks:
+        sink.flush()
+
+def close_log_sinks():
+    """Flush and close all open logfiles. Registered to run at interpreter exit.
+    """
+    with _log_sinks_lock:
+        sinks = _log_sinks.values()
+    for sink in sinks:
+        sink.close()
+
+class Log_Reader(object):
+    """Query a logfile written with the **DI_FORMAT_JSON** record format.
+
+    If the sidecar index *path.idx* exists, only the blocks whose time range, levels and
+    threads can match the query are read, otherwise the whole file is scanned. Rotated
+    segments are read the same way, including gzipped ones (*path* ending in '.gz').
+    """
+    def __init__(self, path):
+        """
+        Args:
+            - path (str): Path of the logfile or a rotated segment of it.
+        """
+        self.path = path
+        if path.endswith(".gz"):
+            self.index_path = path[:-3] + ".idx"
+        else:
+            self.index_path = path + ".idx"
+
+    def records(self, level=None, thread=None, start=None, end=None):
+        """Generator yielding the records matching all supplied criteria in the order they were
+        written. Each record is a dictionary with the keys *'time'*, *'level'*, *'thread'*,
+        *'caller'* and *'message'*.
+
+        Kwargs:
+            - level (str): Only records relayed by this setting, eg. *'debug'*.
+            - thread (str): Only records relayed by the thread with this name.
+            - start (float): Only records relayed at or after this time.
+            - end (float): Only records relayed at or before this time.
+
+        Raises:
+            IOError, ValueError
+        """
+        import json
+
+        with self._open() as f:
+            for (offset, length) in self._blocks(level, thread, start, end):
+                f.seek(offset)
+                if length is None:
+                    lines = f
+                else:
+                    lines = f.read(length).splitlines()
+                for line in lines:
+                    record = json.loads(line)
+                    if level is not None and record['level'] != level:
+                        continue
+                    if thread is not None and record['thread'] != thread:
+                        continue
+                    if start is not None and record['time'] < start:
+                        continue
+                    if end is not None and record['time'] > end:
+                        continue
+                    yield record
+
+    def _open(self):
+        """Open the logfile, decompressing it if it is gzipped.
+        """
+        if self.path.endswith(".gz"):
+            import gzip
+            return gzip.open(self.path, "rb")
+        return open(self.path, "rb")
+
+    def _blocks(self, level, thread, start, end):
+        """Returns a list of (offset, length) tuples to read. Length None reads to the end
+        of file.
+        """
+        import json
+
+        try:
+            index = open(self.index_path, "r")
+        except IOError as exception:
+            if exception.errno != errno.ENOENT:
+                raise
+            return [(0, None)]
+
+        level_bit = _DI_LEVEL_BITS.get(level, 0)
+        blocks = []
+        with index:
+            for line in index:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    #Entry torn by a crash while it was written
+                    continue
+                if level is not None and not entry['levels'] & level_bit:
+                    continue
+                if thread is not None and thread not in entry['threads']:
+                    continue
+                if start is not None and entry['end'] < start:
+                    continue
+                if end is not None and entry['start'] > end:
+                    continue
+                blocks.append((entry['offset'], entry['length']))
+        return blocks
+
+class Log_Writer(threading.Thread):
+    """Background thread writing relayed messages to STDOUT and/or a :class:`Log_Sink`.
+
+    Callers push records onto a bounded queue with :meth:`put` and return immediately. The
+    writer drains the whole queue at once and writes each batch with one call per destination.
+    When the queue is full the *policy* decides what happens:
+        0. **DI_QUEUE_BLOCK** The caller waits until there is room in the queue.
+        1. **DI_QUEUE_DROP_OLDEST** The oldest queued record is discarded.
+        2. **DI_QUEUE_DROP_NEWEST** The record being added is discarded.
+
+    The writer is shared by the whole process, retrieve it with :func:`get_log_writer`.
+
+    A failing write (eg. a full disk) does not stop the writer: the records of that
+    destination are lost, and the error is counted and kept.
+
+    Attributes:
+        - self.dropped_oldest (int): Number of records discarded by DI_QUEUE_DROP_OLDEST.
+        - self.dropped_newest (int): Number of records discarded by DI_QUEUE_DROP_NEWEST.
+        - self.write_errors (int): Number of failed writes to STDOUT or a logfile.
+        - self.last_error (Exception): The latest write error, None if there was none.
+    """
+    def __init__(self, queue_size=DI_LOG_QUEUE_SIZE, policy=DI_QUEUE_BLOCK):
+        """
+        Kwargs:
+            - queue_size (int): Maximum number of records waiting to be written.
+            - policy (int): One of the DI_QUEUE_ overflow policies.
+
+        Raises:
+            TypeError, AttributeError
+        """
+        import collections
+
+        if not isinstance(queue_size, int) or queue_size <= 0:
+            raise TypeError("'queue_size' argument must be a positive 'int'")
+        if policy not in (DI_QUEUE_BLOCK, DI_QUEUE_DROP_OLDEST, DI_QUEUE_DROP_NEWEST):
+            raise AttributeError("Unknown queue policy '%s'." % str(policy))
+
+        threading.Thread.__init__(self, name="Log_Writer")
+        self.daemon = True
+        self.queue_size = queue_size
+        self.policy = policy
+        self.dropped_oldest = 0
+        self.dropped_newest = 0
+        self.write_errors = 0
+        self.last_error = None
+        self._queue = collections.deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._in_flight = False
+        self._stopping = False
+
+    @property
+    def dropped(self):
+        """Total number of records discarded due to a full queue.
+        """
+        return self.dropped_oldest + self.dropped_newest
+
+    def put(self, record, DI_level, sink=None):
+        """Queue the :class:`Log_Record` *record* for output to the channels of *DI_level*.
+        *sink* is the :class:`Log_Sink` used when the level includes the logfile. If the writer
+        thread is not running, eg. in a forked child process, the record is written right away.
+        """
+        if not self.is_alive():
+            self._write_batch([(record, DI_level, sink)])
+            return
+        with self._cond:
+            if len(self._queue) >= self.queue_size:
+                if self.policy == DI_QUEUE_DROP_NEWEST:
+                    self.dropped_newest += 1
+                    return
+                elif self.policy == DI_QUEUE_DROP_OLDEST:
+                    self._queue.popleft()
+                    self.dropped_oldest += 1
+                else:
+                    while len(self._queue) >= self.queue_size and not self._stopping:
+                        if not self.is_alive():
+                            #Nothing will make room, do not wait forever
+                            self.dropped_newest += 1
+                            return
+                        self._cond.wait(0.1)
+            self._queue.append((record, DI_level, sink))
+            self._cond.notify_all()
+
+    def flush(self):
+        """Block until every queued record has been handed to its destination.
+        """
+        with self._cond:
+            while (self._queue or self._in_flight) and self.is_alive():
+                self._cond.wait(0.1)
+
+    def close(self):
+        """Write all queued records and stop the writer thread.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        """Writer loop. Not called directly, the thread is started by :func:`get_log_writer`.
+        """
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batch = list(self._queue)
+                self._queue.clear()
+                self._in_flight = True
+                self._cond.notify_all()
+
+            try:
+                self._write_batch(batch)
+            finally:
+                with self._cond:
+                    self._in_flight = False
+                    self._cond.notify_all()
+
+    def _write_batch(self, batch):
+        """Write a list of (record, DI_level, sink) tuples with one call per destination.
+        """
+        import sys
+
+        stdout = []
+        sinks = {}
+        for (record, DI_level, sink) in batch:
+            if DI_level == DI_STDOUT or DI_level == DI_STDOUT_LOG:
+                stdout.append(record.text())
+            if sink is not None and (DI_level == DI_LOG or DI_level == DI_STDOUT_LOG):
+                sinks.setdefault(sink, []).append(record)
+        if stdout:
+            self._write(sys.stdout.write, "".join(stdout))
+        for (sink, records) in sinks.items():
+            self._write(sink.write_batch, records)
+
+    def _write(self, write, data):
+        """Call *write* with *data*, counting instead of raising errors so the writer keeps
+        running.
+        """
+        try:
+            write(data)
+        except Exception as exception:
+            with self._cond:
+                self.write_errors += 1
+                self.last_error = exception
+
+_log_writer = None
+
+def get_log_writer(queue_size=DI_LOG_QUEUE_SIZE, policy=DI_QUEUE_BLOCK):
+    """Return the process wide :class:`Log_Writer`, starting it if it is not running. The
+    queue settings are only applied when the writer is created.
+    """
+    global _log_writer
+    with _log_sinks_lock:
+        if _log_writer is None:
+            import atexit
+            _log_writer = Log_Writer(queue_size, policy)
+            _log_writer.start()
+            atexit.register(close_log_writer)
+        return _log_writer
+
+def flush_log_writer():
+    """Block until the :class:`Log_Writer` queue is empty, then flush all logfiles.
+    """
+    if _log_writer is not None:
+        _log_writer.flush()
+    flush_log_sinks()
+
+def close_log_writer():
+    """Stop the :class:`Log_Writer` after it has written all queued records, then close all
+    logfiles. Registered to run at interpreter exit.
+    """
+    if _log_writer is not None:
+        _log_writer.close()
+    close_log_sinks()
+
+def _before_fork():
+    """Internal. Write the buffers of all logfiles and take every lock of the logging and
+    STDOUT routing, so a child forked while other threads are relaying messages does not
+    inherit a lock held by a thread that does not exist in it. Must be followed by
+    :func:`_after_fork` in both the parent and the child.
+    """
+    _log_sinks_lock.acquire()
+    if _log_writer is not None:
+        _log_writer._cond.acquire()
+    for sink in _log_sinks.values():
+        sink._cond.acquire()
+        sink._lock.acquire()
+        try:
+            sink._write_buffer()
+        except Exception as exception:
+            sink._error = exception
+        for stripe in sink._stripes:
+            stripe.lock.acquire()
+    _thread_output_lock.acquire()
+
+def _after_fork(child):
+    """Internal. Release the locks taken by :func:`_before_fork`. In the *child* the records
+    queued or buffered by the parent are dropped, the parent writes them.
+    """
+    _thread_output_lock.release()
+    for sink in _log_sinks.values():
+        if child:
+            sink._reset_after_fork()
+        for stripe in sink._stripes:
+            stripe.lock.release()
+        sink._lock.release()
+        sink._cond.release()
+    if _log_writer is not None:
+        if child:
+            _log_writer._queue.clear()
+            _log_writer._in_flight = False
+        _log_writer._cond.release()
+    _log_sinks_lock.release()
+
+class Deferred(object):
+    """Argument to :meth:`Display_Information.verbose`, :meth:`Display_Information.debug` or
+    :meth:`Display_Information.vdebug` that is only evaluated if the message is relayed.
+
+    Example:
+        self.debug("State: %s", Deferred(repr, self.large_state))
+    calls *repr(self.large_state)* only when the **'debug'** setting is not DI_IGNORE.
+    """
+    __slots__ = ('method', 'args')
+
+    def __init__(self, method, *args):
+        """
+        Args:
+            - method (callable method): Called with *args* to produce the argument value.
+            - *args (): Arguments supplied to *method*.
+        """
+        self.method = method
+        self.args = args
+
+    def __call__(self):
+        return self.method(*self.args)
+
+def _resolve_deferred(args):
+    """Replace every :class:`Deferred` in the *args* tuple with its value.
+    """
+    for arg in args:
+        if isinstance(arg, Deferred):
+            return tuple([a() if isinstance(a, Deferred) else a for a in args])
+    return args
+
+def _caller_name(depth):
+    """Return the name of the function *depth* frames above the caller of this function.
+    Reads only the frame asked for instead of building the full stack like inspect.stack().
+    """
+    import sys
+
+    if hasattr(sys, '_getframe'):
+        return sys._getframe(depth + 1).f_code.co_name
+    import inspect
+    return inspect.stack()[depth + 1][3]
+
 class Display_Information(object):
     """This class is utilized to relay information flow throughout the program.
 
@@ -58,10 +1000,13 @@ class Display_Information(object):
         - :meth:`vdebug` used to notify user with detailed debug information.
     When a call is made to one of these methods, they will determine where to relay the message
     based on their settings. The message can be routed to STDOUT, logfile or be ignored.
+    Ignored messages are never formatted, wrap expensive arguments in :class:`Deferred` or
+    check :meth:`debug_enabled` (and friends) to avoid computing them as well.
 
-    If the message is sent to a logfile, the file will be opened for append, and closed after
-    the message has been written to it. Thus, IOError may be raised by a call to any of the
-    information relay methods.
+    If the message is sent to a logfile, it is handed to the :class:`Log_Sink` shared by all
+    instances logging to that file. The sink keeps the file open and buffers messages, writing
+    them when the buffer is full, after a time interval or when :meth:`log_flush` is called.
+    Thus, IOError may be raised by a call to any of the information relay methods.
     """
     def __init__(self, DI_settings=None):
         """
@@ -85,6 +1030,33 @@ class Display_Information(object):
                   for append when a verbose call is made.
                 - *'log_filename_prefix'*: **str** Prefix for the log filename. Has no effect if
                   *log_filename* is supplied. Default value is 'CONSOLE'.
+                - *'log_buffer_size'*: **int** Number of buffered bytes before the logfile is
+                  written to. Default value is **DI_LOG_BUFFER_SIZE**.
+                - *'log_flush_interval'*: **float** Maximum number of seconds a message is
+                  buffered before it is written to the logfile. Default value is
+                  **DI_LOG_FLUSH_INTERVAL**.
+                - *'log_rotate_size'*: **int** Rotate the logfile when it exceeds this many
+                  bytes. Default value is **DI_LOG_ROTATE_SIZE** (no rotation).
+                - *'log_rotate_interval'*: **float** Rotate the logfile after this many
+                  seconds. Default value is **DI_LOG_ROTATE_INTERVAL** (no rotation).
+                - *'log_rotate_compress'*: **bool** gzip rotated logfiles in the background.
+                  Default value is False.
+                - *'log_rotate_keep'*: **int** Number of rotated logfiles to keep. Default value
+                  is **DI_LOG_ROTATE_KEEP** (keep all).
+                - *'log_async'*: **bool** Hand messages to the background :class:`Log_Writer`
+                  instead of writing them in the calling thread. Default value is False.
+                - *'log_queue_size'*: **int** Size of the :class:`Log_Writer` queue. Default
+                  value is **DI_LOG_QUEUE_SIZE**.
+                - *'log_queue_policy'*: **int** Overflow policy of the :class:`Log_Writer`
+                  queue, one of **DI_QUEUE_BLOCK**, **DI_QUEUE_DROP_OLDEST** or
+                  **DI_QUEUE_DROP_NEWEST**. Default value is **DI_QUEUE_BLOCK**.
+                - *'log_format'*: **int** Format of the logfile records, **DI_FORMAT_TEXT** for
+                  the plain text also written to STDOUT or **DI_FORMAT_JSON** for one JSON
+                  object per line, readable with :class:`Log_Reader`. Default value is
+                  **DI_FORMAT_TEXT**.
+                - *'debug_caller'*, *'verbosedebug_caller'*: **bool** Prefix :meth:`debug`
+                  respectively :meth:`vdebug` messages with the name of the calling method.
+                  Default value is True.
             If additional keys are present, they will be ignored.
 
         Attribute:
@@ -99,11 +1071,10 @@ class Display_Information(object):
         Expected DI_settings would look something like:
         {'v':DI_STDOUT, 'd':DI_LOG, 'vd':DI_STDOUT_LOG, 'log_filename_prefix':(str), 'log_filename':(str)}
 
-        Raises:
-            OSError, TypeError, AttributeError
+        The log directory is created when the first message is written to the logfile.
 
-        Modules:
-            os
+        Raises:
+            TypeError, AttributeError
         """
         """
         Internal Attributes:
@@ -113,16 +1084,17 @@ class Display_Information(object):
               exception is raised. (May/will be convient in derived classes where this class
               has yet to be initialized)
         """
-        import os
+        if DI_settings == None:
+            DI_settings = {}
+        if not isinstance(DI_settings, dict):
+            raise TypeError("Invalid argument 'DI_settings'. Must be of type 'dict'")
 
         self.display_information_settings = {}
         self.log_filename_prefix = None
         self.log_filename = None
-        try:
-            os.makedirs('logs')
-        except OSError as exception:
-            if exception.errno != errno.EEXIST:
-                raise
+        self.log_directory = DI_LOG_DIRECTORY
+        self._log_sink = None
+        self._log_writer = None
 
         if "log_filename_prefix" in DI_settings:
             self.log_filename_prefix = DI_settings["log_filename_prefix"]
@@ -146,16 +1118,52 @@ class Display_Information(object):
         self.display_information_settings['log_filename_prefix'] = self.log_filename_prefix
         self.display_information_settings['log_filename'] = self.log_filename
 
+        buffer_size = DI_settings.get("log_buffer_size", DI_LOG_BUFFER_SIZE)
+        if not isinstance(buffer_size, int):
+            raise TypeError("Invalid argument 'log_buffer_size'. Must be of type 'int'")
+        flush_interval = DI_settings.get("log_flush_interval", DI_LOG_FLUSH_INTERVAL)
+        if not isinstance(flush_interval, (int, float)):
+            raise TypeError("Invalid argument 'log_flush_interval'. Must be of type 'float'")
+        self.display_information_settings['log_buffer_size'] = buffer_size
+        self.display_information_settings['log_flush_interval'] = flush_interval
+
+        for (setting, default, types) in [('log_rotate_size', DI_LOG_ROTATE_SIZE, int),
+                ('log_rotate_interval', DI_LOG_ROTATE_INTERVAL, (int, float)),
+                ('log_rotate_compress', False, bool), ('log_rotate_keep', DI_LOG_ROTATE_KEEP, int)]:
+            value = DI_settings.get(setting, default)
+            if not isinstance(value, types):
+                raise TypeError("Invalid argument '%s'. Must be of type '%s'" %
+                        (setting, type(default).__name__))
+            self.display_information_settings[setting] = value
+
+        log_async = DI_settings.get("log_async", False)
+        if not isinstance(log_async, bool):
+            raise TypeError("Invalid argument 'log_async'. Must be of type 'bool'")
+        queue_size = DI_settings.get("log_queue_size", DI_LOG_QUEUE_SIZE)
+        queue_policy = DI_settings.get("log_queue_policy", DI_QUEUE_BLOCK)
+        self.display_information_settings['log_async'] = log_async
+        self.display_information_settings['log_queue_size'] = queue_size
+        self.display_information_settings['log_queue_policy'] = queue_policy
+        if log_async:
+            self._log_writer = get_log_writer(queue_size, queue_policy)
+
+        log_format = DI_settings.get("log_format", DI_FORMAT_TEXT)
+        if log_format not in (DI_FORMAT_TEXT, DI_FORMAT_JSON):
+            raise AttributeError("Invalid value range. Unknown flag value '%s' for key "
+                    "'log_format'." % str(log_format))
+        self.display_information_settings['log_format'] = log_format
+
+        for setting in ['debug_caller', 'verbosedebug_caller']:
+            with_caller = DI_settings.get(setting, True)
+            if not isinstance(with_caller, bool):
+                raise TypeError("Invalid argument '%s'. Must be of type 'bool'" % setting)
+            self.display_information_settings[setting] = with_caller
+
         #Create delimiters for all supported settings, initializing them to false
         supported_settings = ['verbose', 'debug', 'verbosedebug']
         for setting in supported_settings:
             self.display_information_settings[setting] = DI_IGNORE
 
-        if DI_settings == None:
-            return
-        if not isinstance(DI_settings, dict):
-            raise TypeError("Invalid argument 'DI_settings'. Must be of type 'dict'")
-
         for (setting, DI_level) in DI_settings.items():
             if setting in supported_settings:
                 if not isinstance(DI_level, int):
@@ -181,9 +1189,11 @@ class Display_Information(object):
         No sanity check is performed on relation between identifier and supplied argument.
         """
         self._assistant_is_initialized()
-        tmp = format % args
-        display = "%s\n" % tmp
-        self._assistant_information_relay(display, self.display_information_settings['verbose'])
+        DI_level = self.display_information_settings['verbose']
+        if DI_level == DI_IGNORE:
+            return
+        record = Log_Record('verbose', format % _resolve_deferred(args))
+        self._assistant_information_relay(record, DI_level)
 
     def debug(self, format, *args):
         """Outputs the supplied message to the appropriate channel spesified at initialization.
@@ -198,8 +1208,12 @@ class Display_Information(object):
         No sanity check is performed on relation between identifier and supplied argument.
         """
         self._assistant_is_initialized()
-        display = self._assistant_debug(format, *args)
-        self._assistant_information_relay(display, self.display_information_settings['debug'])
+        DI_level = self.display_information_settings['debug']
+        if DI_level == DI_IGNORE:
+            return
+        record = self._assistant_debug('debug',
+                self.display_information_settings['debug_caller'], format, *args)
+        self._assistant_information_relay(record, DI_level)
 
     def vdebug(self, format, *args):
         """Outputs the supplied message to the appropriate channe spesified at initialization.
@@ -214,9 +1228,31 @@ class Display_Information(object):
         No sanity check is performed on relation between identifier and supplied argument.
         """
         self._assistant_is_initialized()
-        display = self._assistant_debug(format, *args)
-        self._assistant_information_relay(display,
-                self.display_information_settings['verbosedebug'])
+        DI_level = self.display_information_settings['verbosedebug']
+        if DI_level == DI_IGNORE:
+            return
+        record = self._assistant_debug('verbosedebug',
+                self.display_information_settings['verbosedebug_caller'], format, *args)
+        self._assistant_information_relay(record, DI_level)
+
+    def verbose_enabled(self):
+        """Returns True if :meth:`verbose` messages are relayed anywhere. Use it to skip
+        building expensive messages altogether.
+        """
+        self._assistant_is_initialized()
+        return self.display_information_settings['verbose'] != DI_IGNORE
+
+    def debug_enabled(self):
+        """Returns True if :meth:`debug` messages are relayed anywhere.
+        """
+        self._assistant_is_initialized()
+        return self.display_information_settings['debug'] != DI_IGNORE
+
+    def vdebug_enabled(self):
+        """Returns True if :meth:`vdebug` messages are relayed anywhere.
+        """
+        self._assistant_is_initialized()
+        return self.display_information_settings['verbosedebug'] != DI_IGNORE
 
     def _assistant_is_initialized(self):
         """Hack? to check if class is initialized. A CallError exception is raised if
@@ -226,18 +1262,20 @@ class Display_Information(object):
             return
         raise CallError("Display_Information not initialized. Programming Error.")
 
-    def _assistant_debug(self, format, *args):
+    def _assistant_debug(self, level, with_caller, format, *args):
         """Perform the formating of our message for the debug calls (debug / vdebug).
-        """
-        import inspect
-        import threading
+        The caller is the method that called debug / vdebug, two frames up from here.
 
-        msg = format % args
-        display = "[%s: (%s)]: %s\n"% (threading.current_thread().name, inspect.stack()[2][3],msg)
-        return display
+        Returns:
+            :class:`Log_Record`
+        """
+        msg = format % _resolve_deferred(args)
+        if not with_caller:
+            return Log_Record(level, msg)
+        return Log_Record(level, msg, _caller_name(2))
 
-    def _assistant_information_relay(self, msg, DI_level):
-        """Write the message to the output levels determined by the DI_level.
+    def _assistant_information_relay(self, record, DI_level):
+        """Write the :class:`Log_Record` to the output levels determined by the DI_level.
         Will create/open the file if DI_level is appending to it.
         """
         import sys
@@ -245,12 +1283,190 @@ class Display_Information(object):
         if DI_level == DI_IGNORE:
             return
 
+        sink = None
+        if DI_level == DI_LOG or DI_level == DI_STDOUT_LOG:
+            if self._log_sink is None:
+                settings = self.display_information_settings
+                self._log_sink = get_log_sink(self.log_directory + self.log_filename,
+                        settings['log_buffer_size'], settings['log_flush_interval'],
+                        rotate_size=settings['log_rotate_size'],
+                        rotate_interval=settings['log_rotate_interval'],
+                        rotate_compress=settings['log_rotate_compress'],
+                        rotate_keep=settings['log_rotate_keep'],
+                        record_format=settings['log_format'])
+            sink = self._log_sink
+
+        if self._log_writer is not None:
+            self._log_writer.put(record, DI_level, sink)
+            return
+
         if DI_level == DI_STDOUT or DI_level == DI_STDOUT_LOG:
-            sys.stdout.write(msg)
+            sys.stdout.write(record.text())
 
-        if DI_level == DI_LOG or DI_level == DI_STDOUT_LOG:
-            with open(self.log_directory + self.log_filename, "a") as f:
-                f.write(msg)
+        if sink is not None:
+            sink.write(record)
+
+    def log_flush(self):
+        """Write all queued and buffered messages to their destination. Has no effect if nothing
+        has been relayed.
+        """
+        if self._log_writer is not None:
+            self._log_writer.flush()
+        if self._log_sink is not None:
+            self._log_sink.flush()
+
+class _Flag_Fields(object):
+    """Internal. Read-only dictionary access to the fields of :class:`Flag` and
+    :class:`Active_Flag`, so handlers written against the former flag dictionaries
+    (eg. *map["longf"]*) keep working.
+    """
+    __slots__ = ()
+    _fields = ()
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def get(self, key, default=None):
+        if key not in self._fields:
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        return list(self._fields)
+
+    def values(self):
+        return [getattr(self, key) for key in self._fields]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self._fields]
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__,
+                ", ".join(["%s=%r" % item for item in self.items()]))
+
+class Flag(_Flag_Fields):
+    """A flag option of a :class:`Command`, created by :meth:`Command.add_flag`.
+
+    Attributes:
+        - self.longf (str): *long* flag name, including the leading dashes.
+        - self.shortf (str): *short* flag name including the leading dash, or None.
+        - self.description (str): Description of the flag.
+        - self.input (int): One of the FLAG_INPUT_ flags, the expected input type.
+        - self.method (callable method): Flag handler, None for :meth:`default_flag_handler`.
+    """
+    __slots__ = ('longf', 'shortf', 'description', 'input', 'method')
+    _fields = __slots__
+
+    def __init__(self, longf, shortf, description, input, method):
+        self.longf = longf
+        self.shortf = shortf
+        self.description = description
+        self.input = input
+        self.method = method
+
+class Active_Flag(_Flag_Fields):
+    """A :class:`Flag` present on a parsed line, together with its converted input.
+
+    Attributes:
+        - self.flag (Flag): The flag that was matched.
+        - self.input (): The input converted to its expected type, None if the flag takes no
+          input.
+        - self.longf, self.description, self.method: Read from *self.flag*.
+    """
+    __slots__ = ('flag', 'input')
+    _fields = ('longf', 'description', 'input', 'method')
+
+    def __init__(self, flag, input):
+        self.flag = flag
+        self.input = input
+
+    @property
+    def longf(self):
+        return self.flag.longf
+
+    @property
+    def description(self):
+        return self.flag.description
+
+    @property
+    def method(self):
+        return self.flag.method
+
+class Command_Context(object):
+    """Immutable description of one command or flag handler invocation: the parsed line and,
+    inside a flag handler, the flag that activated it.
+
+    Each thread has its own current context, read by handlers through
+    :attr:`Console.current_context` or the *current_command_* and *current_flag_* attributes
+    of :class:`Console`. Commands dispatched from different threads, sessions or jobs
+    therefore never see each others arguments.
+
+    Attributes:
+        - self.command_name (str): Name of the invoked command, 'TERMINAL' for the terminal.
+        - self.active_flags (tuple): :class:`Active_Flag` objects present on the line.
+        - self.additional_args (tuple): All unaccounted for tokens of the line (str).
+        - self.flag_name (str): *longf* of the flag whose handler is running, or None.
+        - self.flag_input (): Converted input of that flag, or None.
+    """
+    __slots__ = ('command_name', 'active_flags', 'additional_args', 'flag_name', 'flag_input')
+
+    def __init__(self, command_name=None, active_flags=(), additional_args=(), flag_name=None,
+            flag_input=None):
+        set_field = object.__setattr__
+        set_field(self, 'command_name', command_name)
+        set_field(self, 'active_flags', tuple(active_flags))
+        set_field(self, 'additional_args', tuple(additional_args))
+        set_field(self, 'flag_name', flag_name)
+        set_field(self, 'flag_input', flag_input)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("'Command_Context' object is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("'Command_Context' object is immutable")
+
+    def for_flag(self, active_flag):
+        """Returns the context of the handler of *active_flag* (:class:`Active_Flag`).
+        """
+        return Command_Context(self.command_name, self.active_flags, self.additional_args,
+                active_flag.longf, active_flag.input)
+
+    def replace(self, **fields):
+        """Returns a copy of the context with the given fields replaced.
+        """
+        values = dict((name, getattr(self, name)) for name in self.__slots__)
+        values.update(fields)
+        return Command_Context(**values)
+
+    def __repr__(self):
+        return "Command_Context(%s)" % ", ".join("%s=%r" % (name, getattr(self, name))
+                for name in self.__slots__)
+
+_EMPTY_CONTEXT = Command_Context()
+
+def _context_view(field, doc):
+    """Internal. Property of :class:`Console` reading *field* of the current
+    :class:`Command_Context` of the calling thread. Assigning the property replaces the
+    context of the calling thread. Tuple fields are returned as lists.
+    """
+    def get(self):
+        value = getattr(self.current_context, field)
+        if isinstance(value, tuple):
+            return list(value)
+        return value
+
+    def set(self, value):
+        self._context_local.context = self.current_context.replace(**{field: value})
+
+    return property(get, set, doc=doc)
 
 class Command(object):
     """Object represents a command. It holds a list of flags associated with this command,
@@ -273,22 +1489,32 @@ class Command(object):
             - self.method (callable method): Method to be executed for current command.
             - self.description (str): Description of what the command does.
             - self.available_flags (list): All flags added to this command.
+            - self.aliases (list): Additional names of the command in the console, see
+              :meth:`Console.console_add_command`.
+            - self.run_in (int): Where the command runs, see
+              :meth:`Console.console_add_command`.
             - self.usage (str): Description of expected (additional) arguments custom for
               this particular command. Eg. *"path_to_dir(str) max_open_files(int)"*. This will
               be appended after *'Usage: self.command_name [--flags] '*
 
         The '--help' flag is automatically added at initialization.
 
-        The *available_flags* attribute dictionary is formated as follows:
-        {'longf':{'shortf':(str), 'description:(str), 'input':(), 'method':(callable method)}}
-        with respect to the attributes submitted in :meth:`add_flag`.
+        The *available_flags* attribute holds one :class:`Flag` per call to :meth:`add_flag`,
+        readable like the dictionary
+        {'longf':(str), 'shortf':(str), 'description:(str), 'input':(), 'method':(callable method)}
 
         Raises:
             TypeError
         """
         """
         Private Attributes
-            - self._PHC (_Print_Help_Command object): Assistant class to print all help options.
+            - self._PHC (_Print_Help_Console object): Assistant class to print all help options.
+              Created by the first '--help'.
+            - self._flag_index (dict): Maps every *longf* and *shortf* to its entry in
+              *available_flags*. Kept up to date by :meth:`add_flag` and used by the parser.
+            - self._flag_trie (_Prefix_Trie): Flag names for completion, see
+              :meth:`_get_flag_trie`.
+            - self._version (int): Incremented by :meth:`add_flag`, invalidates cached help.
         """
         if hasattr(method, '__call__') == False:
             raise TypeError("'method' argument is not a callable")
@@ -300,8 +1526,13 @@ class Command(object):
         self.method = method
         self.description = description
         self.available_flags = []
+        self.aliases = []
+        self.run_in = COMMAND_RUN_INLINE
+        self._flag_index = {}
+        self._flag_trie = None
+        self._version = 0
         self.usage = usage
-        self._PHC = _Print_Help_Console(self)
+        self._PHC = None
 
         self.add_flag(longf="help", shortf="h", description="Display available flag options",
                 method=self._command_help)
@@ -324,6 +1555,8 @@ class Command(object):
             raise TypeError("'longf' argument is not a string")
         if input != None and not isinstance(input, int):
             raise TypeError("'input' argument is not a integer")
+        if input != None and input != FLAG_INPUT_IGNORE and input not in _flag_inputs:
+            raise TypeError("'input' argument is not a registered FLAG_INPUT_ value")
 
         if longf[:2] != "--":
             longf = "--"+longf
@@ -332,9 +1565,62 @@ class Command(object):
         if shortf != None and len(shortf) != 2:
             raise TypeError("'shortf' argument must be in form 'x' or '-x'")
 
-        flag_dict = {'longf':longf, 'shortf':shortf, 'description':description,
-                'input':input,'method':method}
-        self.available_flags.append(flag_dict)
+        flag = Flag(longf, shortf, description, input, method)
+        self.available_flags.append(flag)
+        self._version += 1
+        #First flag added with a name wins, like the in-order scan it replaces
+        self._flag_index.setdefault(longf, flag)
+        if shortf != None:
+            self._flag_index.setdefault(shortf, flag)
+        if self._flag_trie is not None:
+            self._flag_trie.insert(longf, flag)
+            if shortf != None:
+                self._flag_trie.insert(shortf, flag)
+
+    def _get_flag_trie(self):
+        """Returns the :class:`_Prefix_Trie` of all *longf* and *shortf* names, used for
+        completion. Built on first use and kept up to date by :meth:`add_flag`.
+        """
+        if self._flag_trie is None:
+            trie = _Prefix_Trie()
+            for name in self._flag_index:
+                trie.insert(name, self._flag_index[name])
+            self._flag_trie = trie
+        return self._flag_trie
+
+    def add_flag_table(self, table, owner=None):
+        """Add all flags of a table returned by :func:`compile_flag_schema` or
+        :func:`load_flag_schema`. The flags were validated when the table was compiled and are
+        added as is.
+
+        Kwargs:
+            - owner (): Object holding the flag handler methods named in the schema.
+
+        Raises:
+            TypeError if a flag input type is not registered, AttributeError if a named method
+            does not exist.
+        """
+        if not isinstance(table, tuple) or table[:1] != (FLAG_TABLE_VERSION,):
+            raise TypeError("'table' argument is not a flag table of this version")
+        (version, rows, names) = table
+
+        flags = []
+        for (longf, shortf, description, input_name, method_name) in rows:
+            input = get_flag_input(input_name)
+            if input is None:
+                raise TypeError("Flag input '%s' of flag '%s' is not registered" %
+                        (input_name, longf))
+            method = None
+            if method_name is not None:
+                method = getattr(owner, method_name)
+            flags.append(Flag(longf, shortf, description, input, method))
+        self.available_flags.extend(flags)
+        flag_index = self._flag_index
+        for (name, row) in names:
+            flag_index.setdefault(name, flags[row])
+            if self._flag_trie is not None:
+                self._flag_trie.insert(name, flags[row])
+        self._version += 1
 
 
     def _command_help(self):
@@ -342,28 +1628,526 @@ class Command(object):
             Internal command called whenever the HELP flag is
             issued for a command
         """
+        if self._PHC is None:
+            self._PHC = _Print_Help_Console(self)
         self._PHC.print_help(self, True)
 
-class Console(Display_Information):
-    """Class to derive from. This class offers two main functionalities, both decoupled from
-    eachother.
+#Flag input types: FLAG_INPUT_ value -> (name, converter), see register_flag_input
+_flag_inputs = {}
+_flag_input_names = {}
 
-    **Terminal Flag Handler**
+def register_flag_input(name, converter):
+    """Register a flag input type, usable as *input* of :meth:`Console.terminal_add_flag` and
+    :meth:`Console.console_add_command` flags, by *name* in :meth:`terminal_quickadd_flags` and
+    flag schemas, and shown as *[name]* in help. The converter runs once, when the flag is
+    parsed, and its result is the flag input given to the handlers.
 
-    A simple initialization of your derived class will parse and execute(by default) all flags
-    (defined) present on the terminal at program start(through the sys.argv attribute).
-    Override :meth:`terminal_init` to add custom flags to your program
-    at startup. Each flag may be associated with a method to be executed when the flag is
-    present. Each flag may also expect an input of any sort(string, integer or float) available
-    within the method flag handler. If no method is supplied, the default
-    :meth:`default_flag_handler` is called. Override this to handle all flags in one place
-    by defaut.
+    Args:
+        - name (str): Type name, eg. *"port"*.
+        - converter (callable): Called with the flag value (str), returns the converted value.
+          Raises ValueError for invalid values. ValueError, OverflowError and TypeError are
+          reported as :class:`InputError`.
 
-    The flags are either processed automatically after :meth:`terminal_init` has finished,
-    or not processed at all until :meth:`terminal_process_flags` is called manually if
-    *disable_auto_process_flags* is set.
+    Returns:
+        The new FLAG_INPUT_ value (int).
 
-    Flags are identified by their *longf* name, and all flags are required to have one.
+    Raises:
+        TypeError, AttributeError if *name* is registered already.
+    """
+    if not isinstance(name, str):
+        raise TypeError("'name' argument is not a string")
+    if hasattr(converter, '__call__') == False:
+        raise TypeError("'converter' argument is not a callable")
+    if name.lower() in _flag_input_names or name.lower() == STR_FLAG_INPUT_IGNORE:
+        raise AttributeError("Flag input '%s' is already registered" % name)
+
+    input = max(_flag_inputs) + 1 if _flag_inputs else FLAG_INPUT_IGNORE + 1
+    _flag_inputs[input] = (name, converter)
+    _flag_input_names[name.lower()] = input
+    return input
+
+def get_flag_input(name):
+    """Returns the FLAG_INPUT_ value of a flag input type *name*, None if it is not registered.
+    """
+    if name.lower() == STR_FLAG_INPUT_IGNORE:
+        return FLAG_INPUT_IGNORE
+    return _flag_input_names.get(name.lower())
+
+def _convert_number_list(value, typecode, convert):
+    """Comma separated numbers to an array.array of *typecode*, with the result of
+    *convert* (int or float) per element.
+
+    The list is parsed as a JSON array first: the C scanner of the json module converts the
+    numbers without a Python call per element. JSON literals float() and int() do not accept
+    (true, false, null, strings, nested arrays) end up in the exact path, as do numbers JSON
+    does not accept, such as *".5"* or *"inf"*.
+    """
+    import array
+    import json
+
+    try:
+        if value and "true" not in value and "false" not in value:
+            return array.array(typecode, json.loads("[" + value + "]", parse_int=convert))
+    except (ValueError, TypeError, OverflowError):
+        pass
+    try:
+        return array.array(typecode, map(convert, value.split(',')))
+    except OverflowError:
+        raise ValueError("Number out of range")
+
+def _convert_int_list(value):
+    """Comma separated integers to an array.array('l').
+    """
+    return _convert_number_list(value, 'l', int)
+
+def _convert_float_list(value):
+    """Comma separated floats to an array.array('d').
+    """
+    return _convert_number_list(value, 'd', float)
+
+def _convert_range(value):
+    """*"start:stop"* or *"start:stop:step"* to an xrange.
+    """
+    parts = value.split(':')
+    if len(parts) not in (2, 3):
+        raise ValueError("Expected start:stop[:step]")
+    return xrange(*[int(part) for part in parts])
+
+#Byte size suffixes: binary multiples, and decimal ones where spelled "kb", "mb", ...
+_BYTE_UNITS = {"": 1, "b": 1,
+        "k": 1 << 10, "kib": 1 << 10, "kb": 10 ** 3,
+        "m": 1 << 20, "mib": 1 << 20, "mb": 10 ** 6,
+        "g": 1 << 30, "gib": 1 << 30, "gb": 10 ** 9,
+        "t": 1 << 40, "tib": 1 << 40, "tb": 10 ** 12}
+
+def _convert_bytes(value):
+    """Byte size such as *"512"*, *"4k"*, *"1.5MiB"* or *"2GB"* to an int.
+    """
+    number = value.rstrip("bBiIkKmMgGtT")
+    unit = _BYTE_UNITS.get(value[len(number):].lower())
+    if unit is None:
+        raise ValueError("Unknown byte size unit")
+    number = number.strip()
+    try:
+        size = int(number) * unit
+    except ValueError:
+        size = int(float(number) * unit)
+    if size < 0:
+        raise ValueError("Negative byte size")
+    return size
+
+_DURATION_UNITS = {"us": 1e-6, "ms": 1e-3, "s": 1.0, "m": 60.0, "h": 3600.0, "d": 86400.0}
+_duration_pattern = None
+
+def _convert_duration(value):
+    """Duration such as *"1.5"* (seconds), *"250ms"* or *"1h30m"* to float seconds. Units are
+    *us*, *ms*, *s*, *m*, *h* and *d*. Negative and non-finite durations are rejected.
+    """
+    global _duration_pattern
+    import math
+
+    try:
+        seconds = float(value)
+    except ValueError:
+        seconds = None
+    if seconds is None:
+        if _duration_pattern is None:
+            import re
+            _duration_pattern = re.compile(r"\s*(\d+(?:\.\d*)?|\.\d+)\s*(us|ms|s|m|h|d)")
+        seconds = 0.0
+        position = 0
+        value = value.rstrip()
+        while position < len(value):
+            match = _duration_pattern.match(value, position)
+            if match is None:
+                raise ValueError("Invalid duration")
+            seconds += float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+            position = match.end()
+        if position == 0:
+            raise ValueError("Invalid duration")
+    if seconds < 0:
+        raise ValueError("Negative duration")
+    if math.isinf(seconds) or math.isnan(seconds):
+        raise ValueError("Duration is not finite")
+    return seconds
+
+for (_input, _name, _converter) in (
+        (FLAG_INPUT_STR, STR_FLAG_INPUT_STR, str),
+        (FLAG_INPUT_INT, STR_FLAG_INPUT_INT, int),
+        (FLAG_INPUT_FLOAT, STR_FLAG_INPUT_FLOAT, float),
+        (FLAG_INPUT_INT_LIST, STR_FLAG_INPUT_INT_LIST, _convert_int_list),
+        (FLAG_INPUT_FLOAT_LIST, STR_FLAG_INPUT_FLOAT_LIST, _convert_float_list),
+        (FLAG_INPUT_RANGE, STR_FLAG_INPUT_RANGE, _convert_range),
+        (FLAG_INPUT_BYTES, STR_FLAG_INPUT_BYTES, _convert_bytes),
+        (FLAG_INPUT_DURATION, STR_FLAG_INPUT_DURATION, _convert_duration)):
+    _flag_inputs[_input] = (_name, _converter)
+    _flag_input_names[_name] = _input
+del _input, _name, _converter
+
+def compile_flag_schema(schema):
+    """Validate a declarative flag schema and compile it into a flag table, which
+    :meth:`Command.add_flag_table` adds to a command without validating the flags again.
+
+    Args:
+        - schema (): A dict {'flags': [flag, ...]} or just the list of flags. Each flag is a
+          dict with the keys of :meth:`Command.add_flag`:
+            * *'longf'* (str): Required, the leading dashes are optional.
+            * *'shortf'* (str): Optional single character, the leading dash is optional.
+            * *'description'* (str): Optional.
+            * *'input'*: Optional, a FLAG_INPUT_ value or its name (*"str"*, *"int"*,
+              *"float"*, *"ignore"*, ... or a name given to :func:`register_flag_input`).
+            * *'method'* (str): Optional name of the flag handler method, looked up on the
+              object passed to :meth:`Command.add_flag_table`. The :meth:`default_flag_handler`
+              is used without it.
+
+    Returns:
+        The flag table: a tuple (FLAG_TABLE_VERSION, rows, names) of only tuples, strings,
+        ints and None, so it is immutable and can be pickled or marshaled. *rows* holds
+        (longf, shortf, description, input type name, method name) per flag, *names* holds
+        (name, row number) for every *longf* and *shortf*.
+
+    Raises:
+        TypeError
+    """
+    if isinstance(schema, dict):
+        schema = schema.get('flags', [])
+    if not isinstance(schema, (list, tuple)):
+        raise TypeError("Flag schema is not a 'dict' or 'list'")
+
+    rows = []
+    names = []
+    for entry in schema:
+        if not isinstance(entry, dict):
+            raise TypeError("Flag schema entry is not a 'dict'")
+        longf = entry.get('longf')
+        shortf = entry.get('shortf')
+        description = entry.get('description', "")
+        input = entry.get('input', FLAG_INPUT_IGNORE)
+        method = entry.get('method')
+        if isinstance(longf, unicode):
+            longf = str(longf)
+        if isinstance(shortf, unicode):
+            shortf = str(shortf)
+        if isinstance(description, unicode):
+            description = description.encode("utf-8")
+        if isinstance(method, unicode):
+            method = str(method)
+        if isinstance(input, basestring):
+            input = get_flag_input(str(input))
+
+        if not isinstance(longf, str):
+            raise TypeError("'longf' of flag schema entry is not a string")
+        if shortf is not None and not isinstance(shortf, str):
+            raise TypeError("'shortf' of flag '%s' is not a string" % longf)
+        if not isinstance(description, str):
+            raise TypeError("'description' of flag '%s' is not a string" % longf)
+        if input != FLAG_INPUT_IGNORE and input not in _flag_inputs:
+            raise TypeError("'input' of flag '%s' is not a FLAG_INPUT_ value" % longf)
+        if method is not None and not isinstance(method, str):
+            raise TypeError("'method' of flag '%s' is not a method name" % longf)
+
+        if longf[:2] != "--":
+            longf = "--" + longf
+        if shortf is not None and shortf[:1] != '-':
+            shortf = '-' + shortf
+        if shortf is not None and len(shortf) != 2:
+            raise TypeError("'shortf' of flag '%s' must be in form 'x' or '-x'" % longf)
+
+        names.append((longf, len(rows)))
+        if shortf is not None:
+            names.append((shortf, len(rows)))
+        #Stored by name, FLAG_INPUT_ values of registered types depend on registration order
+        if input == FLAG_INPUT_IGNORE:
+            input = STR_FLAG_INPUT_IGNORE
+        else:
+            input = _flag_inputs[input][0].lower()
+        rows.append((longf, shortf, description, input, method))
+    return (FLAG_TABLE_VERSION, tuple(rows), tuple(names))
+
+def load_flag_schema(schema, cache_directory=None):
+    """Compile a flag schema with :func:`compile_flag_schema`, reusing a table cached on disk.
+
+    Tables are cached in *cache_directory* in marshal format, named by the SHA-1 hash of the
+    schema content (for a file, its bytes). Processes starting with an unchanged schema load
+    the prebuilt table instead of parsing and validating the schema again. Cache files are
+    written atomically, so concurrently starting processes may share the directory.
+
+    Args:
+        - schema (): Schema dict or list, see :func:`compile_flag_schema`, or path (str) of a
+          JSON file holding one.
+
+    Kwargs:
+        - cache_directory (str): Directory of the cached tables, created if missing. None
+          disables the cache.
+
+    Returns:
+        The flag table.
+
+    Raises:
+        TypeError, IOError, ValueError (invalid JSON)
+    """
+    import hashlib
+    import json
+    import marshal
+    import os
+    import sys
+
+    if isinstance(schema, str):
+        with open(schema, "rb") as f:
+            content = f.read()
+        schema = None
+    else:
+        content = json.dumps(schema, sort_keys=True)
+    if cache_directory is None:
+        return compile_flag_schema(json.loads(content) if schema is None else schema)
+
+    #marshal formats differ between Python versions
+    key = "%d:%d.%d:" % ((FLAG_TABLE_VERSION,) + tuple(sys.version_info[:2]))
+    digest = hashlib.sha1(key + content).hexdigest()
+    path = os.path.join(cache_directory, digest + ".flagtable")
+    try:
+        with open(path, "rb") as f:
+            table = marshal.load(f)
+        if isinstance(table, tuple) and table[:1] == (FLAG_TABLE_VERSION,):
+            return table
+    except IOError as exception:
+        if exception.errno != errno.ENOENT:
+            raise
+    except (EOFError, ValueError, TypeError):
+        #Damaged cache file, it is replaced below
+        pass
+
+    table = compile_flag_schema(json.loads(content) if schema is None else schema)
+    try:
+        os.makedirs(cache_directory)
+    except OSError as exception:
+        if exception.errno != errno.EEXIST:
+            raise
+    temporary = "%s.%d.tmp" % (path, os.getpid())
+    with open(temporary, "wb") as f:
+        marshal.dump(table, f)
+    os.rename(temporary, path)
+    return table
+
+#Parsed flag configuration files: absolute path -> (mtime, size, flag values)
+_flag_config_cache = {}
+_flag_config_lock = threading.Lock()
+
+def _load_flag_config(path):
+    """Returns the flag values of the JSON configuration file *path* as a tuple of
+    (name, value) pairs, () if the file does not exist. Parsed files are kept per path and
+    read again only when their modification time or size changed.
+
+    The file holds an object mapping flag names, with or without the leading dashes, to
+    values, either at the top level or under the key *"flags"*.
+
+    Raises:
+        IOError, ValueError (invalid JSON), InputError
+    """
+    import json
+    import os
+
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except OSError as exception:
+        if exception.errno == errno.ENOENT:
+            return ()
+        raise
+    with _flag_config_lock:
+        cached = _flag_config_cache.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime, stat.st_size):
+            return cached[2]
+
+    with open(path, "rb") as f:
+        content = json.load(f)
+    if isinstance(content, dict) and isinstance(content.get("flags"), dict):
+        content = content["flags"]
+    if not isinstance(content, dict):
+        raise InputError("Configuration file '%s' does not hold an object of flag values", path)
+    values = []
+    for name in sorted(content):
+        value = content[name]
+        if isinstance(value, unicode):
+            value = value.encode("utf-8")
+        values.append((str(name), value))
+    values = tuple(values)
+    with _flag_config_lock:
+        _flag_config_cache[path] = (stat.st_mtime, stat.st_size, values)
+    return values
+
+_FLAG_SOURCE_SWITCHES = "1, true, yes, on, 0, false, no, off"
+
+def _flag_source_switch(value):
+    """Returns True if the string *value* turns a flag without input on, None if it turns it
+    off (including the empty string) and False if it is neither.
+    """
+    switch = value.strip().lower()
+    if switch in ("1", "true", "yes", "on"):
+        return True
+    if switch in ("", "0", "false", "no", "off"):
+        return None
+    return False
+
+def _flag_source_token(value):
+    """Returns a flag value of a configuration file or environment variable as the token
+    given on the terminal.
+    """
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return ",".join([_flag_source_token(item) for item in value])
+    return str(value)
+
+class _Latency_Histogram(object):
+    """Internal. Latency histogram in the style of HdrHistogram: microsecond values are
+    counted in buckets of 64 linear sub-buckets per power of two, so percentiles are exact
+    below 128 microseconds and within 1/64 (1.6%) of the recorded value above, at a fixed
+    memory cost (under 2000 buckets up to a day).
+    """
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = []
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def record(self, seconds):
+        """Count one latency of *seconds* (float).
+        """
+        value = int(seconds * 1000000)
+        if value < 128:
+            index = max(value, 0)
+        else:
+            shift = value.bit_length() - 7
+            index = 128 + (shift - 1) * 64 + (value >> shift) - 64
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @staticmethod
+    def _bucket_limit(index):
+        """Returns the highest microsecond value counted in bucket *index*.
+        """
+        if index < 128:
+            return index
+        shift = (index - 128) // 64 + 1
+        return ((((index - 128) % 64 + 64) + 1) << shift) - 1
+
+    def summary(self):
+        """Returns a dict of the count, total, min, mean, max and 50th, 90th, 99th and 99.9th
+        percentiles in seconds, and the non empty buckets as [highest microsecond value,
+        count] pairs, eg. for merging histograms of several processes.
+        """
+        buckets = [[self._bucket_limit(index), count]
+                for (index, count) in enumerate(self.counts) if count]
+        summary = {'count': self.count, 'total': self.total, 'min': self.min or 0.0,
+                'mean': self.total / self.count if self.count else 0.0, 'max': self.max,
+                'buckets': buckets}
+        for (name, percentile) in (('p50', 50.0), ('p90', 90.0), ('p99', 99.0),
+                ('p999', 99.9)):
+            rank = self.count * percentile / 100.0
+            seen = 0
+            value = 0.0
+            for (limit, count) in buckets:
+                seen += count
+                if seen >= rank:
+                    value = min(limit / 1000000.0, self.max)
+                    break
+            summary[name] = value
+        return summary
+
+class _Console_Stats(object):
+    """Internal. Parse and handler latency histograms per command and flag, see
+    :meth:`Console.console_set_stats`. Safe to record from several threads.
+    """
+    def __init__(self, dump_file=None):
+        self.dump_file = dump_file
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, name, phase, seconds):
+        """Count a latency of *seconds* for *phase* (*"parse"* or *"handler"*) of command or
+        flag (*kind*) *name*.
+        """
+        key = (kind, name, phase)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Latency_Histogram()
+            histogram.record(seconds)
+
+    def timed(self, generator, kind, name, elapsed):
+        """Generator yielding on what the handler *generator* yields, recording the time spent
+        running it, plus *elapsed* seconds, when it is done. Time suspended is not counted.
+        """
+        while True:
+            start = time.time()
+            try:
+                delay = next(generator)
+            except StopIteration:
+                elapsed += time.time() - start
+                break
+            elapsed += time.time() - start
+            yield delay
+        self.record(kind, name, "handler", elapsed)
+
+    def snapshot(self, reset=False):
+        """Returns {'commands': {name: {phase: summary}}, 'flags': {name: {phase: summary}}},
+        see :meth:`_Latency_Histogram.summary`. Flags are named *"command --flag"*.
+        """
+        with self._lock:
+            histograms = self._histograms
+            if reset:
+                self._histograms = {}
+            else:
+                histograms = dict(histograms)
+        snapshot = {'commands': {}, 'flags': {}}
+        for ((kind, name, phase), histogram) in histograms.items():
+            snapshot[kind + 's'].setdefault(name, {})[phase] = histogram.summary()
+        return snapshot
+
+    def dump(self):
+        """Write a snapshot to *dump_file* as JSON, if set.
+        """
+        import json
+
+        if self.dump_file is None:
+            return
+        snapshot = self.snapshot()
+        snapshot['time'] = time.time()
+        with open(self.dump_file, "w") as f:
+            json.dump(snapshot, f, indent=1, sort_keys=True)
+
+class Console(Display_Information):
+    """Class to derive from. This class offers two main functionalities, both decoupled from
+    eachother.
+
+    **Terminal Flag Handler**
+
+    A simple initialization of your derived class will parse and execute(by default) all flags
+    (defined) present on the terminal at program start(through the sys.argv attribute).
+    Override :meth:`terminal_init` to add custom flags to your program
+    at startup. Each flag may be associated with a method to be executed when the flag is
+    present. Each flag may also expect an input of any sort(string, integer or float) available
+    within the method flag handler. If no method is supplied, the default
+    :meth:`default_flag_handler` is called. Override this to handle all flags in one place
+    by defaut.
+
+    The flags are either processed automatically after :meth:`terminal_init` has finished,
+    or not processed at all until :meth:`terminal_process_flags` is called manually if
+    *disable_auto_process_flags* is set.
+
+    Flags are identified by their *longf* name, and all flags are required to have one.
     Long flags (*longf*) are identified by two leading dashes. The shortcut one character option
     with one leading dash is optional.
     All flags (in both usages) are parsed and executed in order of apperance left to right.
@@ -416,8 +2200,8 @@ class Console(Display_Information):
             - self.terminal (Command object): Special case :class:`Command` object to represent
               the *terminal*.
             - self.terminal_active_flags (list): List of all flags matching available flags
-              present on the *terminal* at program launch. Each list item is a dictionary on the
-              form:
+              present on the *terminal* at program launch. Each list item is an
+              :class:`Active_Flag`, readable like a dictionary on the form:
               {'longf':(str), 'description':(str), 'input':(int), 'method':(callable)}
               where *longf* is the unique flag identifier.
             - self.terminal_additional_args (list): List of all unaccounted for arguments on
@@ -426,7 +2210,8 @@ class Console(Display_Information):
         Attributes available in :class:`Command` activation handler method and
         :meth:`default_flag_handler`/supplied flag activation handler method:
             - self.current_command_active_flags (list): List of all flags matching available flags
-              present at the *console* command launch. Each list item is a dictionary on the form:
+              present at the *console* command launch. Each list item is an :class:`Active_Flag`,
+              readable like a dictionary on the form:
               {'longf':(str), 'description':(str), 'input':(int), 'method':(callable)} where
               longf is the unique flag identifier.
             - self.current_command_additional_args (list): List of all unaccounted for arguments
@@ -440,6 +2225,9 @@ class Console(Display_Information):
               that object converted to its intended object type (eg. *int* or *float*). If no
               option is expected, this attribute will be None.
 
+        These attributes are views of :attr:`current_context`, the immutable
+        :class:`Command_Context` of the handler running in the calling thread. Commands
+        running at the same time in other threads, server sessions or jobs do not affect them.
 
         Modules:
             sys
@@ -450,14 +2238,28 @@ class Console(Display_Information):
         """This docstring is not parsed by Sphinx.
 
         Private Attributes:
+            - self._command_index (dict): Maps command names and aliases to Command objects.
+            - self._command_trie (_Prefix_Trie): Command names and aliases, resolves
+              abbreviations.
+            - self._builtin_commands (set): The default commands, which give their names up to
+              commands added by the program.
+            - self._context_local (threading.local): Holds the current Command_Context of
+              each thread in its *context* attribute.
             - self._available_commands (list): List of all Command objects that is added to the
               *console*.
+            - self._commands_version (int): Incremented by :meth:`console_add_command`,
+              invalidates the cached command list of *help*.
+            - self._PHC (_Print_Help_Console): Prints *help*, created on first use.
             - self._processed_flag_options (bool): Indicates whether or not the
               self._terminal_process_flags() function has been called. In other words, whether or
               not the terminal flags has been parsed and Display_Information has been initialized.
             - self._DI_settings (dict): Internal variable to pass initialized Display_Information
               settings through internal class methods. Holds the value of Console initialization
               parameter DI_settings.
+            - self._flag_sources (tuple): (environment prefix, configuration file) read for
+              terminal flags besides sys.argv, see :meth:`terminal_set_flag_sources`.
+            - self._stats (_Console_Stats): Latency histograms, None unless enabled with
+              :meth:`console_set_stats`.
         """
 
         import sys
@@ -470,18 +2272,24 @@ class Console(Display_Information):
             raise AttributeError("disable_auto_process_flags not of type 'bool'")
 
         self._available_commands = []
+        self._commands_version = 0
+        self._PHC = None
+        self._console_loop = None
+        self._command_index = {}
+        self._command_trie = _Prefix_Trie()
+        self._builtin_commands = set()
+        self._job_pool = None
+        self._job_pool_settings = (CONSOLE_JOB_WORKERS, CONSOLE_JOB_QUEUE_SIZE)
+        self._history_settings = (None, CONSOLE_HISTORY_LENGTH)
+        self._flag_sources = (None, None)
+        self._stats = None
         self.terminal = None
         self.terminal_active_flags = []
         self.terminal_additional_args = []
         self._processed_flag_options = False
         self._DI_settings = DI_settings
         #Attributes available in flag/command supplied methods
-        self.current_command_active_flags = []
-        self.current_command_additional_args = []
-        self.current_command_name = None
-        #Attributes available only within a flag handler
-        self.current_flag_name = None
-        self.current_flag_input = None
+        self._context_local = threading.local()
 
         self.terminal = Command(sys.argv[0], self._dummy, "Terminal - represents startup.")
         if not disable_default_flags:
@@ -491,9 +2299,39 @@ class Console(Display_Information):
         if not disable_auto_process_flags:
             self._terminal_process_flags()
 
-                #Add default commands
-        self.console_add_command("help", self._console_help, "Print all available commands.")
-        self.console_add_command("exit", self._dummy, "Exit the console.")
+                #Add default commands, except those the program already added in terminal_init
+        for (name, method, description, usage) in [
+                ("help", self._console_help, "Print all available commands.", ""),
+                ("exit", self._dummy, "Exit the console.", ""),
+                ("jobs", self._console_jobs, "List background jobs.", ""),
+                ("wait", self._console_wait, "Wait for background jobs and print their output.",
+                    "[job_id ...]"),
+                ("cancel", self._console_cancel, "Cancel background jobs.",
+                    "job_id [job_id ...]"),
+                ("stats", self._console_stats, "Print latency statistics of commands and flags.",
+                    "[reset]")]:
+            if name not in self._command_index:
+                self._builtin_commands.add(self.console_add_command(name, method, description,
+                        usage))
+
+    current_command_active_flags = _context_view('active_flags',
+            "List of :class:`Active_Flag` of the running command.")
+    current_command_additional_args = _context_view('additional_args',
+            "List of unaccounted for tokens (str) of the running command.")
+    current_command_name = _context_view('command_name', "Name of the running command.")
+    current_flag_name = _context_view('flag_name', "*longf* of the running flag handler.")
+    current_flag_input = _context_view('flag_input', "Input of the running flag handler.")
+    #Kept for handlers written against the names used by earlier versions
+    command_active_flags = current_command_active_flags
+    command_additional_args = current_command_additional_args
+    command_name = current_command_name
+
+    @property
+    def current_context(self):
+        """:class:`Command_Context` of the command or flag handler running in the calling
+        thread.
+        """
+        return getattr(self._context_local, 'context', _EMPTY_CONTEXT)
 
     def default_flag_handler(self):
         """Default flag handler invoked when no method is supplied to the flag option.
@@ -501,8 +2339,8 @@ class Console(Display_Information):
         Override this function if you want to handle all flags in one method.
 
         Available attributes:
-            - self.current_command_active_flags (list): List of dictionaries holding all present
-              flags when invoking this command.
+            - self.current_command_active_flags (list): List of :class:`Active_Flag` holding all
+              present flags when invoking this command.
             - self.current_command_additional_args (list): List of string objects, all unaccounted
               for tokens invoking this command.
             - self.current_command_name (str): *Command.command_name* that was invoked with
@@ -521,6 +2359,20 @@ class Console(Display_Information):
         """
         pass
 
+    def _console_cleanup(self):
+        """Run the overridable :meth:`console_cleanup`, dump the statistics and write all
+        buffered log messages to disk.
+        """
+        try:
+            self.console_cleanup()
+        finally:
+            if self._job_pool is not None:
+                self._job_pool.close()
+                self._job_pool = None
+            if self._stats is not None:
+                self._stats.dump()
+            flush_log_writer()
+
     def console_start(self, threaded=True, daemon=True):
         """Start the in-program console. This will run in the terminal where the program
         was initiated.
@@ -536,13 +2388,16 @@ class Console(Display_Information):
         If console is set to be threaded, apply a try catch around the remainder of your program,
         (exluding the call to *console_start*) catching KeyboardInterrupt. When caught,
         set the event object returned from a threaded call to *console_start* to set().
-        This will terminate the running (nondaemon) thread after the enter key has been struck.
+        The console thread waits for input and the event together and terminates right away.
+        The event is also set when the console ends by itself, so *shutdown.wait()* blocks
+        until the console is done.
         .. note::
-            Due to the blocking nature of raw_input, the enter key must be struck for the
-            thread to check the status of the shutdown event.
+            While a line is being typed on a terminal, it is read by raw_input, and the
+            shutdown takes effect when the enter key is struck.
 
         Returns:
-            - *shutdown* threading.Event object if console is a thread.
+            - *shutdown* event object (with the methods of threading.Event) if console is a
+              thread.
             - *None* if console is not a thread.(Will return when console exits)
         """
 
@@ -555,20 +2410,259 @@ class Console(Display_Information):
             program_console.run()
             return None
 
-    def console_add_command(self, name, method, description, usage=""):
+    def console_run_loop(self, max_concurrent=1):
+        """Run the in-program console on an event loop in the calling thread, see
+        :class:`Console_Loop`. Command and flag handlers written as generator functions run
+        interleaved with other commands and can be cancelled. Returns when the loop ends.
+
+        Kwargs:
+            - max_concurrent (int): Maximum number of commands running interleaved.
+
+        Use :meth:`console_stop_loop` to end the loop from another thread or a signal handler.
+        """
+        self._console_loop = Console_Loop(self, self.display_information_settings,
+                max_concurrent)
+        try:
+            self._console_loop.run()
+        finally:
+            self._console_loop = None
+
+    def console_serve(self, address, max_concurrent=CONSOLE_SERVER_MAX_CONCURRENT,
+            max_sessions=CONSOLE_SERVER_MAX_SESSIONS, output_limit=CONSOLE_SERVER_OUTPUT_LIMIT):
+        """Serve the in-program console commands over a Unix domain socket or TCP in the
+        calling thread, see :class:`Console_Server`. Connect with :class:`Console_Client`.
+        Returns when the server is stopped with :meth:`console_stop_loop` or a
+        KeyboardInterrupt.
+
+        Args:
+            - address (): Path (str) of a Unix domain socket, or (host, port) tuple for TCP.
+
+        Kwargs:
+            - max_concurrent (int): Maximum number of commands running interleaved.
+            - max_sessions (int): Connections beyond this number are refused.
+            - output_limit (int): Bytes of unsent output per session before its input and
+              command are paused.
+
+        Raises:
+            TypeError, socket.error
+        """
+        self._console_loop = Console_Server(self, address, self.display_information_settings,
+                max_concurrent, max_sessions, output_limit)
+        try:
+            self._console_loop.run()
+        finally:
+            self._console_loop = None
+
+    def console_stop_loop(self):
+        """Stop the loop started by :meth:`console_run_loop` or :meth:`console_serve` and
+        cancel its running commands. Has no effect if no loop is running.
+        """
+        loop = self._console_loop
+        if loop is not None:
+            loop.stop()
+
+    def console_run_script(self, script, stop_on_error=True):
+        """Execute in-program console commands from a script instead of the interactive
+        prompt. Commands are streamed one line at a time, no prompt is printed and no terminal
+        input is read.
+
+        Args:
+            - script (): Path (str) to a file with one command per line, or any iterable of
+              lines, eg. an open file, *sys.stdin* or a generator.
+
+        Kwargs:
+            - stop_on_error (bool): Stop at the first failing command (unknown command, invalid
+              flags or an exception raised by a handler). If False, continue with the next line.
+
+        Returns:
+            List of tuples (line_number (int), line (str), seconds (float), exception), one
+            per executed command, with the time spent parsing and executing it. *exception* is
+            None if the command succeeded.
+
+        Raises:
+            IOError
+        """
+        program_console = Console_Program(self, self.display_information_settings, False)
+        if isinstance(script, str):
+            with open(script, "r") as f:
+                return program_console.run_script(f, stop_on_error)
+        return program_console.run_script(script, stop_on_error)
+
+    def console_add_command(self, name, method, description, usage="", aliases=None,
+            run_in=COMMAND_RUN_INLINE):
         """Creates a new in-console command.
 
         In order to add flag options to this newly created command, use :meth:`Command.add_flag`
         method on the returned object.
 
+        Kwargs:
+            - aliases (list): Additional names (str) the command can be invoked by.
+            - run_in (int): Where the flag handlers and method of the command run:
+
+              - COMMAND_RUN_INLINE: In the console, which waits for the command to finish.
+              - COMMAND_RUN_THREAD: As a :class:`Console_Job` on a worker thread of the job
+                pool. The console prints the job id and continues right away.
+              - COMMAND_RUN_PROCESS: As a :class:`Console_Job` in a child process forked by a
+                worker thread. Use for CPU bound commands. Changes the command makes to the
+                program are lost, only its output and (picklable) return value are kept.
+                Requires os.fork, thus not available on Windows.
+
+              Job output and results are read with the *jobs*, *wait* and *cancel* console
+              commands or :meth:`console_get_job`.
+
+        If a name is already taken by another command, the first command added keeps it. The
+        default commands (*help*, *exit*, *jobs*, *wait*, *cancel* and *stats*) are the
+        exception: a command added with the name of one of them replaces it, and one added in
+        :meth:`terminal_init` means the default command is not added at all.
+
         Returns:
             :class:`Command`
+
+        Raises:
+            TypeError
         """
+        if aliases is None:
+            aliases = []
+        if not isinstance(aliases, list):
+            raise TypeError("'aliases' argument is not of type 'list'")
+        if run_in not in (COMMAND_RUN_INLINE, COMMAND_RUN_THREAD, COMMAND_RUN_PROCESS):
+            raise TypeError("'run_in' argument must be one of the COMMAND_RUN_* values")
+        if run_in == COMMAND_RUN_PROCESS:
+            import os
+            if not hasattr(os, 'fork'):
+                raise TypeError("'run_in' COMMAND_RUN_PROCESS requires os.fork, which is not "
+                        "available on this platform")
+        for alias in aliases:
+            if not isinstance(alias, str):
+                raise TypeError("List item in argument 'aliases' is not of type 'string'")
 
         command = Command(name, method, description, usage)
+        command.aliases = aliases
+        command.run_in = run_in
         self._available_commands.append(command)
+        self._commands_version += 1
+        for command_name in [name] + aliases:
+            taken = self._command_index.get(command_name)
+            if taken is None or taken in self._builtin_commands:
+                self._command_index[command_name] = command
+                self._command_trie.insert(command_name, command)
+            if taken in self._builtin_commands and taken.command_name == command_name:
+                self._builtin_commands.discard(taken)
+                self._available_commands.remove(taken)
+        return command
+
+    def console_get_command(self, name):
+        """Look up the command invoked by *name*. *name* is either a command name, an alias or
+        an abbreviation matching the start of exactly one command (including its aliases).
+
+        Returns:
+            - :class:`Command` if *name* identifies a command.
+            - None if *name* is unknown or ambiguous.
+        """
+        command = self._command_index.get(name)
+        if command is None:
+            command = self._command_trie.unique(name)
         return command
 
+    def console_set_job_pool(self, workers=CONSOLE_JOB_WORKERS, queue_size=CONSOLE_JOB_QUEUE_SIZE):
+        """Size the job pool running commands added with *run_in* COMMAND_RUN_THREAD or
+        COMMAND_RUN_PROCESS. Must be called before the first job is started.
+
+        Kwargs:
+            - workers (int): Number of jobs running at once.
+            - queue_size (int): Number of jobs that may wait for a worker. Commands submitted
+              while the queue is full are refused.
+
+        Raises:
+            TypeError, CallError
+        """
+        if not isinstance(workers, int) or workers <= 0:
+            raise TypeError("'workers' argument must be a positive 'int'")
+        if not isinstance(queue_size, int) or queue_size <= 0:
+            raise TypeError("'queue_size' argument must be a positive 'int'")
+        if self._job_pool is not None:
+            raise CallError("console_set_job_pool must be called before the first job is started")
+        self._job_pool_settings = (workers, queue_size)
+
+    def console_set_history(self, path, length=CONSOLE_HISTORY_LENGTH):
+        """Keep the command history of the interactive console in a file, so it is available
+        again in the next session. Takes effect when the console is started.
+
+        Args:
+            - path (str): History file, eg. *os.path.expanduser("~/.myprogram_history")*. None
+              keeps the history in memory only.
+
+        Kwargs:
+            - length (int): Number of lines kept in memory and loaded from the file.
+
+        Raises:
+            TypeError
+        """
+        if path is not None and not isinstance(path, str):
+            raise TypeError("'path' argument is not of type 'str'")
+        if not isinstance(length, int) or length <= 0:
+            raise TypeError("'length' argument must be a positive 'int'")
+        self._history_settings = (path, length)
+
+    def console_set_stats(self, enabled=True, dump_file=None):
+        """Record the number of calls and latency histograms of the parse time and handler time
+        of every console command, and the handler time of every flag. Call it from
+        :meth:`terminal_init` to include the terminal flags. The statistics are printed by
+        the *stats* command and returned by :meth:`console_stats`.
+
+        Handlers returning a generator are timed while they run, not while suspended. The
+        handler time of COMMAND_RUN_PROCESS jobs is spent in another process and not recorded.
+
+        Kwargs:
+            - enabled (bool): Start recording, or stop recording and drop the statistics.
+            - dump_file (str): Write the statistics as JSON to this file when the console
+              terminates, see :meth:`console_cleanup`.
+
+        Raises:
+            TypeError
+        """
+        if not isinstance(enabled, bool):
+            raise TypeError("'enabled' argument is not of type 'bool'")
+        if dump_file is not None and not isinstance(dump_file, str):
+            raise TypeError("'dump_file' argument is not of type 'str'")
+        self._stats = _Console_Stats(dump_file) if enabled else None
+
+    def console_stats(self, reset=False):
+        """Returns a snapshot of the statistics recorded since :meth:`console_set_stats`, or
+        None if disabled.
+
+        Kwargs:
+            - reset (bool): Start counting from zero again.
+
+        Returns:
+            Dict {'commands': {command_name: {'parse': summary, 'handler': summary}},
+            'flags': {"command_name --flag": {'handler': summary}}}. Terminal flags are named
+            *"TERMINAL --flag"*. Each summary is a dict with the keys *count*, *total*, *min*,
+            *mean*, *max*, *p50*, *p90*, *p99* and *p999* (in seconds), and *buckets*: the
+            histogram as [highest microsecond value, count] pairs.
+        """
+        if self._stats is None:
+            return None
+        return self._stats.snapshot(reset)
+
+    def console_get_job(self, job_id):
+        """Returns the :class:`Console_Job` with *job_id*, or None if unknown. Only the most
+        recent finished jobs are kept.
+        """
+        if self._job_pool is None:
+            return None
+        return self._job_pool.get(job_id)
+
+    def _console_job_pool(self):
+        """Returns the job pool, created on first use.
+        """
+        import atexit
+
+        if self._job_pool is None:
+            self._job_pool = _Job_Pool(*self._job_pool_settings)
+            atexit.register(self._job_pool.close)
+        return self._job_pool
+
     def terminal_init(self):
         """Called before terminal args are parsed. This allows for custom flags to be
         added by overriding this method. Add flag options by calling
@@ -600,6 +2694,13 @@ class Console(Display_Information):
                 1. **FLAG_INPUT_STR** *string* input is expected.
                 2. **FLAG_INPUT_INT** *integer* input is expected.
                 3. **FLAG_INPUT_FLOAT** *float* input is expected.
+                4. **FLAG_INPUT_INT_LIST** comma separated *integers*, given as array.array('l').
+                5. **FLAG_INPUT_FLOAT_LIST** comma separated *floats*, given as array.array('d').
+                6. **FLAG_INPUT_RANGE** *start:stop[:step]*, given as xrange.
+                7. **FLAG_INPUT_BYTES** byte size such as *4k*, *1.5MiB* or *2GB*, given as int.
+                8. **FLAG_INPUT_DURATION** duration such as *1.5*, *250ms* or *1h30m*, given as
+                   float seconds.
+              Or a value returned by :func:`register_flag_input`.
             - method (callable method): If present, this method will be executed once the
               flag option is present.
 
@@ -614,6 +2715,61 @@ class Console(Display_Information):
 
         self.terminal.add_flag(longf, shortf, description, input, method)
 
+    def terminal_load_schema(self, schema, cache_directory=None):
+        """Add the terminal flags of a declarative schema, see :func:`compile_flag_schema`.
+        Flag handler methods are named in the schema and looked up on this object. Like
+        :meth:`terminal_add_flag`, call it from :meth:`terminal_init`.
+
+        Args:
+            - schema (): Schema dict or list, or path (str) of a JSON file holding one.
+
+        Kwargs:
+            - cache_directory (str): Keep the compiled schema in this directory, so later
+              program starts load it instead of compiling it again, see
+              :func:`load_flag_schema`.
+
+        Raises:
+            CallError, TypeError, AttributeError, IOError, ValueError
+        """
+        if self._processed_flag_options:
+            raise CallError("Programming Error: Attempting to add a terminal flag after terminal "
+                    "flags have been parsed. Adding terminal flags must be done within overidden "
+                    "method terminal_init or Console must be initialized with "
+                    "disable_auto_process_flags set to True. See documentation.")
+
+        self.terminal.add_flag_table(load_flag_schema(schema, cache_directory), self)
+
+    def terminal_set_flag_sources(self, env_prefix=None, config_file=None):
+        """Read terminal flags from environment variables and a configuration file besides
+        the terminal line. Terminal flags override environment variables, which override the
+        configuration file. Values from all sources are parsed, converted and handled like
+        flags given on the terminal and are part of :attr:`terminal_active_flags`. Like
+        :meth:`terminal_add_flag`, call it from :meth:`terminal_init`.
+
+        Kwargs:
+            - env_prefix (str): Flag *--flag-name* is read from environment variable
+              *PREFIX_FLAG_NAME*. Flags without input are present if the variable is set to
+              *1*, *true*, *yes* or *on*, and absent if it is set to *0*, *false*, *no*, *off*
+              or empty.
+            - config_file (str): Path of a JSON file mapping flag names to values, eg.
+              {"radius": 2.5, "weights": [0.1, 0.2], "verbose": true}, optionally under the
+              key *"flags"*. Flags without input are present if their value is true, strings
+              are read like environment variables (*"off"* is false). A missing file is
+              ignored. Files are parsed once per process and read again only when they are
+              modified.
+
+        Raises:
+            CallError, TypeError
+        """
+        if self._processed_flag_options:
+            raise CallError("Programming Error: Attempting to set terminal flag sources after "
+                    "terminal flags have been parsed. See documentation of terminal_add_flag.")
+        if env_prefix is not None and not isinstance(env_prefix, str):
+            raise TypeError("'env_prefix' argument is not a string")
+        if config_file is not None and not isinstance(config_file, str):
+            raise TypeError("'config_file' argument is not a string")
+        self._flag_sources = (env_prefix, config_file)
+
     def terminal_quickadd_flags(self, longf_list, shortf_str=None):
         """
         Quick and dirty way to add terminal flags. Utilizeable in two cases:
@@ -632,6 +2788,8 @@ class Console(Display_Information):
                 * *"float"* for **FLAG_INPUT_FLOAT**
                 * *"str"* for **FLAG_INPUT_STR**
                 * *"int"* for **FLAG_INPUT_INT**
+                * *"int_list"*, *"float_list"*, *"range"*, *"bytes"*, *"duration"* or any name
+                  given to :func:`register_flag_input` for the matching input type.
         Kwargs:
             - shortf_str (str): a string of characters, at most *n* characters long where *n*
               is the number of list items in *'longf_list'*. Each characters represents
@@ -677,235 +2835,2107 @@ class Console(Display_Information):
             flag_list = flag_string.split("=")
             input_type = FLAG_INPUT_IGNORE
             if len(flag_list) == 2:
-                option = flag_list[1].lower()
-                if option == STR_FLAG_INPUT_STR:
-                    input_type = FLAG_INPUT_STR
-                elif option == STR_FLAG_INPUT_INT:
-                    input_type = FLAG_INPUT_INT
-                elif option == STR_FLAG_INPUT_FLOAT:
-                    input_type = FLAG_INPUT_FLOAT
+                input_type = get_flag_input(flag_list[1])
+                if input_type is None:
+                    input_type = FLAG_INPUT_IGNORE
+
+            self.terminal_add_flag(flag_list[0], shortf_list[i], input=input_type)
+            i += 1
+
+    def terminal_process_flags(self):
+        """Attempts to process terminal flag options and initialize :class:`Display_Information`.
+        This will fail if terminal flags have already been processed. This method is
+        automatically called internally if :class:`Console` initialization parameter
+        *disable_auto_process_flags* is not set.
+
+        .. note::
+            This method should **ONLY** be called when :class:`Console` is initialized with
+            *disable_auto_process_flags*. If called after terminal flags have been processed,
+            a **CallError** will be raised. Simailary if called twise.
+
+
+        Raises:
+            CallError
+        """
+        if self._processed_flag_options:
+            raise CallError("Programming Error: Terminal has already parsed flag inputs. "
+                "If you ment to call this method you probably need to initialize Console with "
+                "disable_auto_process_flags")
+        self._terminal_process_flags()
+
+    def _terminal_tokens(self):
+        """Returns the terminal line with the flags of the configuration file and environment
+        variables in front of the arguments, see :meth:`terminal_set_flag_sources`. The parser
+        keeps the last of repeated flags, so later sources override earlier ones.
+
+        Modules:
+            os, sys
+        """
+        import os
+        import sys
+
+        (env_prefix, config_file) = self._flag_sources
+        if env_prefix is None and config_file is None:
+            return sys.argv
+
+        values = {}
+        order = []
+        if config_file is not None:
+            for (name, value) in _load_flag_config(config_file):
+                flag = self.terminal._flag_index.get(name if name[:1] == "-" else "--" + name)
+                if flag is None:
+                    raise InputError("Unknown flag '%s' in configuration file '%s'",
+                            name, config_file)
+                if flag.input == FLAG_INPUT_IGNORE and isinstance(value, str):
+                    switch = _flag_source_switch(value)
+                    if switch is False:
+                        raise InputError("Invalid value '%s' of flag '%s' in configuration file "
+                                "'%s'. Expected one of %s", value, name, config_file,
+                                _FLAG_SOURCE_SWITCHES)
+                    value = switch
+                elif flag.input == FLAG_INPUT_IGNORE:
+                    value = bool(value) or None
+                elif value is None:
+                    continue
+                values[flag.longf] = (flag, value)
+                order.append(flag.longf)
+        if env_prefix is not None:
+            environ = os.environ
+            for flag in self.terminal.available_flags:
+                name = "%s_%s" % (env_prefix, flag.longf[2:].upper().replace('-', '_'))
+                value = environ.get(name)
+                if value is None:
+                    continue
+                if flag.input == FLAG_INPUT_IGNORE:
+                    switch = _flag_source_switch(value)
+                    if switch is False:
+                        raise InputError("Invalid value '%s' of environment variable '%s'. "
+                                "Expected one of %s", value, name, _FLAG_SOURCE_SWITCHES)
+                    value = switch
+                values[flag.longf] = (flag, value)
+                order.append(flag.longf)
+
+        tokens = []
+        for longf in order:
+            (flag, value) = values.pop(longf, (None, None))
+            if value is None:
+                continue
+            tokens.append(longf)
+            if flag.input != FLAG_INPUT_IGNORE:
+                tokens.append(_flag_source_token(value))
+        tokens.extend(sys.argv[1:])
+        return iter(tokens)
+
+    def _terminal_process_flags(self):
+        """
+        Process the terminal input line and execute the methods associated with present flags
+
+        Modules:
+            sys
+        """
+        import sys
+        self._processed_flag_options = True
+
+        stats = self._stats
+        if stats is not None:
+            start = time.time()
+        parser = _Console_Parser()
+        parser.parse_line(self.terminal, self._terminal_tokens(), False)
+        if stats is not None:
+            stats.record("command", "TERMINAL", "parse", time.time() - start)
+        self.terminal_active_flags = parser.get_active_flags()
+        self.terminal_additional_args = parser.get_additional_args()
+
+
+        def _update_active_DI(level):
+            for map in self.terminal_active_flags:
+                flag = map["longf"]
+                if flag == "--verbose":
+                    self._DI_settings["verbose"] = level
+                elif flag == "--debug":
+                    self._DI_settings["debug"] = level
+                elif flag == "--verbose-debug":
+                    self._DI_settings["verbosedebug"] = level
+
+        do_exit = False
+        exit_map = None
+        log_level = DI_STDOUT
+        for map in self.terminal_active_flags:
+            flag = map["longf"]
+            if flag == "--help":
+                exit_map = map
+                do_exit = True
+            elif flag == "--log":
+                _update_active_DI(DI_LOG)
+            elif flag == "--log-stdout":
+                _update_active_DI(DI_STDOUT_LOG)
+            elif flag == "--verbose":
+                self._DI_settings["verbose"] = DI_STDOUT
+            elif flag == "--debug":
+                self._DI_settings["debug"] = DI_STDOUT
+            elif flag == "--verbose-debug":
+                self._DI_settings["debug"] = DI_STDOUT
+                self._DI_settings["verbosedebug"] = DI_STDOUT
+
+        if do_exit:
+            exit_map["method"]()
+            sys.exit()
+
+        Display_Information.__init__(self, self._DI_settings)
+
+        #Call flags in order of apperance in string
+        context = Command_Context("TERMINAL", self.terminal_active_flags,
+                self.terminal_additional_args)
+        for map in self.terminal_active_flags:
+            self._context_local.context = context.for_flag(map)
+            if stats is not None:
+                start = time.time()
+            if map["method"] == None:
+                self.default_flag_handler()
+            else:
+                map["method"]()
+            if stats is not None:
+                stats.record("flag", "TERMINAL " + map["longf"], "handler", time.time() - start)
+        self._context_local.context = context
+
+    def _add_default_flags(self):
+        """Assist function to add all default flags
+        """
+        self.terminal.add_flag("--log", "-l",
+                "Route all -v, -d & -D print to logfile instead of STDOUT.")
+        self.terminal.add_flag("--log-stdout", "-L",
+                "Route all -v, -d & -D print to both logfile and STDOUT.")
+        self.terminal.add_flag("--verbose", "-v", "Print detailed program flow to STDOUT.")
+        self.terminal.add_flag("--debug", "-d",
+                "Print debug information in program flow to STDOUT.")
+        self.terminal.add_flag("--verbose-debug", "-D",
+                "Print detailed debug information in program flow to STDOUT.")
+
+    def _console_help(self):
+        """Print all available commands from the console
+        """
+        if self._PHC is None:
+            self._PHC = _Print_Help_Console(self)
+        self._PHC.print_help(self._available_commands, False)
+
+    def _console_jobs(self):
+        """Print all background jobs.
+        """
+        jobs = self._job_pool.jobs() if self._job_pool is not None else []
+        if not jobs:
+            print "\nNo jobs."
+            return
+        lines = ["\n%-6s %-10s %-10s %s" % ("JOB", "STATUS", "SECONDS", "COMMAND")]
+        now = time.time()
+        for job in jobs:
+            if job.started is None:
+                seconds = ""
+            else:
+                seconds = "%.2f" % ((job.finished or now) - job.started)
+            lines.append("%-6d %-10s %-10s %s" % (job.job_id, job.status, seconds,
+                    job.command_name))
+        print "\n".join(lines)
+
+    def _console_jobs_from_args(self):
+        """Returns the jobs named by the additional args of the running command, printing
+        unknown ones.
+        """
+        jobs = []
+        for arg in self.current_command_additional_args:
+            try:
+                job = self.console_get_job(int(arg))
+            except ValueError:
+                job = None
+            if job is None:
+                print "\nUnknown job '%s'." % arg
+            else:
+                jobs.append(job)
+        return jobs
+
+    def _console_wait(self):
+        """Wait for the given jobs, or all jobs, and print their output. Generator so an
+        event loop keeps running other commands meanwhile.
+        """
+        if self.current_command_additional_args:
+            jobs = self._console_jobs_from_args()
+        elif self._job_pool is not None:
+            jobs = self._job_pool.jobs()
+        else:
+            jobs = []
+        for job in jobs:
+            while not job.done():
+                yield 0.05
+            print "\n[%d] %s %s" % (job.job_id, job.command_name, job.status)
+            if job.output:
+                print job.output.strip("\n")
+            if job.error is not None:
+                print job.error
+            elif job.result is not None:
+                print repr(job.result)
+
+    def _console_stats(self):
+        """Print the statistics, see :meth:`console_set_stats`. With the argument *reset*,
+        start counting from zero again.
+        """
+        snapshot = self.console_stats("reset" in self.current_command_additional_args)
+        if snapshot is None:
+            print "\nStatistics are disabled."
+            return
+        lines = ["\n%-32s %-8s %8s %10s %10s %10s %10s" % ("NAME", "PHASE", "COUNT", "MEAN ms",
+                "P50 ms", "P99 ms", "MAX ms")]
+        for kind in ('commands', 'flags'):
+            for name in sorted(snapshot[kind]):
+                for phase in ('parse', 'handler'):
+                    summary = snapshot[kind][name].get(phase)
+                    if summary is None:
+                        continue
+                    lines.append("%-32s %-8s %8d %10.3f %10.3f %10.3f %10.3f" % (name, phase,
+                            summary['count'], summary['mean'] * 1000, summary['p50'] * 1000,
+                            summary['p99'] * 1000, summary['max'] * 1000))
+        if len(lines) == 1:
+            lines.append("No commands recorded.")
+        print "\n".join(lines)
+
+    def _console_cancel(self):
+        """Cancel the given jobs.
+        """
+        for job in self._console_jobs_from_args():
+            job.cancel()
+            print "\n[%d] %s %s" % (job.job_id, job.command_name,
+                    job.status if job.done() else "stopping")
+
+    def _dummy(self):
+        pass
+
+class Console_Program(threading.Thread, Display_Information):
+    """Implements the in-program console loop
+    """
+    def __init__(self, console_object, DI_console_settings=DI_CONSOLE_IGNORE, is_thread=True):
+        """
+        Args:
+            - console_object (Console): Reference to the Console object
+
+        Kwargs:
+            - DI_console_settings (): Can be one of these values:
+                * *(dict)* with the original settings needed for :class:`Display_Information`
+                * *(int)* flag
+                    1. **DI_CONSOLE_IGNORE** - Set all settings to *ignore*.
+                    2. **DI_CONSOLE_IHERIT** - Inherit all DI settings from console
+            - is_thread (bool): Determine whether or not the in-program console should start
+              as a thread.
+
+        Raises:
+            TypeError, AttributeError
+        """
+
+        if is_thread:
+            threading.Thread.__init__(self)
+
+        if isinstance(console_object, Console) == False:
+            raise TypeError("Input object is not instance of class Console")
+        self.console = console_object
+
+        DI_init = None
+        if isinstance(DI_console_settings, int):
+            if DI_console_settings == DI_CONSOLE_IGNORE:
+                DI_init = None
+            elif DI_console_settings == DI_CONSOLE_INHERIT:
+                DI_init = self.console.display_information_settings
+            else:
+                raise AttributeError("Argument 'DI_console_settings' integer flag values are "
+                        "out of bounds. No valid flag.")
+        elif isinstance(DI_console_settings, dict):
+            DI_init = DI_console_settings
+        else:
+            raise TypeError("Argument 'DI_console_settings' is not of supported input types: "
+                    "'int'(flags) or 'dict'")
+
+        self.shutdown = _Shutdown_Event()
+
+        Display_Information.__init__(self, DI_init)
+
+    def run(self):
+        """Method starts the in-program console.
+
+        Not initiated directly, but through :meth:`Console.console_start`
+        """
+        import sys
+        parser = _Console_Parser()
+        line_editor = self._start_line_editor()
+
+        try:
+            try:
+                for input_string in self._input_lines():
+                    if line_editor is not None:
+                        line_editor.add_history(input_string)
+                    try:
+                        command = self._dispatch(parser, input_string)
+                    except InputError as e:
+                        sys.stdout.write("\n%s" % str(e))
+                        continue
+                    if command is not None and command.command_name == "exit":
+                        break
+            except (KeyboardInterrupt, SystemExit):
+                self.console._console_cleanup()
+                self.verbose("Terminating console due to system exception.")
+                self.log_flush()
+                raise SystemExit
+        finally:
+            if line_editor is not None:
+                line_editor.uninstall()
+            #Also tells threads waiting on the event that the console has ended
+            self.shutdown.set()
+
+        #Console terminates with an exit call, end of input or shutdown. Cleanup
+        self.console._console_cleanup()
+
+    def _input_lines(self):
+        """Generator yielding the lines entered on STDIN, printing the prompt before each.
+        Ends when *self.shutdown* is set or, unless STDIN is a terminal, at end of input.
+
+        Where select() supports STDIN, waiting for input is multiplexed with the pipe of
+        *self.shutdown*, so setting it ends the generator at once. While the user is typing
+        on a terminal, the line is read by raw_input (for line editing and completion), and
+        the shutdown is noticed when it is entered.
+        """
+        import os
+        import sys
+
+        try:
+            stdin = sys.stdin.fileno()
+        except (AttributeError, ValueError):
+            stdin = None
+        if os.name != 'posix' or stdin is None:
+            while not self.shutdown.is_set():
+                try:
+                    yield raw_input(CONSOLE_PROMPT)
+                except EOFError:
+                    self.vdebug("EOFError raised - Did user push ctrl-D? Exception ignored.")
+            return
+
+        if sys.stdin.isatty():
+            prompt = CONSOLE_PROMPT.split("\n")[-1]
+            while True:
+                sys.stdout.write(CONSOLE_PROMPT)
+                sys.stdout.flush()
+                if not self._wait_for_input(stdin, True):
+                    return
+                #raw_input prints the prompt again over the one written above
+                sys.stdout.write("\r")
+                try:
+                    line = raw_input(prompt)
+                except EOFError:
+                    self.vdebug("EOFError raised - Did user push ctrl-D? Exception ignored.")
+                    continue
+                if self.shutdown.is_set():
+                    return
+                yield line
+
+        data = ""
+        position = 0
+        while True:
+            sys.stdout.write(CONSOLE_PROMPT)
+            sys.stdout.flush()
+            chunks = []
+            while True:
+                index = data.find("\n", position)
+                if index >= 0:
+                    chunks.append(data[position:index])
+                    position = index + 1
+                    break
+                chunks.append(data[position:])
+                if not self._wait_for_input(stdin, False):
+                    return
+                data = os.read(stdin, 65536)
+                position = 0
+                if not data:
+                    line = "".join(chunks)
+                    if line:
+                        yield line
+                    self.vdebug("End of input, console terminates.")
+                    return
+            yield "".join(chunks)
+
+    def _wait_for_input(self, stdin, cbreak):
+        """Block until *stdin* is readable or *self.shutdown* is set.
+
+        Args:
+            - stdin (int): File descriptor.
+            - cbreak (bool): Put the terminal in cbreak mode while waiting, so the first key
+              pressed counts as input instead of a whole line.
+
+        Returns:
+            False if shutdown is set.
+        """
+        import select
+
+        saved = None
+        if cbreak:
+            import termios
+            import tty
+
+            saved = termios.tcgetattr(stdin)
+            tty.setcbreak(stdin, termios.TCSANOW)
+        try:
+            while not self.shutdown.is_set():
+                try:
+                    readable = select.select([stdin, self.shutdown], [], [])[0]
+                except select.error as e:
+                    if e.args[0] != errno.EINTR:
+                        raise
+                    continue
+                if stdin in readable:
+                    return True
+            return False
+        finally:
+            if saved is not None:
+                termios.tcsetattr(stdin, termios.TCSANOW, saved)
+
+    def _start_line_editor(self):
+        """Install tab completion and history if readline is available and the console reads
+        from a terminal.
+
+        Returns:
+            :class:`_Console_Readline` or None.
+        """
+        import sys
+
+        if not sys.stdin.isatty():
+            return None
+        try:
+            line_editor = _Console_Readline(self.console, *self.console._history_settings)
+        except ImportError:
+            self.vdebug("readline is not available, console has no completion or history.")
+            return None
+        line_editor.install()
+        return line_editor
+
+    def run_script(self, lines, stop_on_error=True):
+        """Execute console commands from an iterable of lines without prompting for input.
+        Empty lines and lines starting with '#' are skipped, the *exit* command ends the
+        script.
+
+        Not initiated directly, but through :meth:`Console.console_run_script`.
+
+        Args:
+            - lines (iterable): Yields one command line (str) at a time.
+
+        Kwargs:
+            - stop_on_error (bool): Stop at the first line raising an exception. If False, the
+              exception is recorded and execution continues with the next line.
+
+        Returns:
+            List of tuples (line_number (int), line (str), seconds (float), exception), one
+            per executed line. *exception* is None if the line executed without error.
+        """
+        parser = _Console_Parser()
+        report = []
+        line_number = 0
+        for line in lines:
+            line_number += 1
+            line = line.strip()
+            if not line or line[0] == '#':
+                continue
+
+            error = None
+            command = None
+            start = time.time()
+            try:
+                command = self._dispatch(parser, line)
+            except Exception as e:
+                error = e
+            report.append((line_number, line, time.time() - start, error))
+
+            if error is not None:
+                self.verbose("Script line %d '%s' failed: %s", line_number, line, str(error))
+                if stop_on_error:
+                    break
+            elif command.command_name == "exit":
+                break
+        return report
+
+    def _dispatch(self, parser, input_string):
+        """Parse one console line and execute the flag handlers and command method.
+        Handlers returning a generator are run to completion, see :meth:`_execute`.
+
+        Returns:
+            - :class:`Command` that was executed.
+            - None if the line is empty.
+
+        Raises:
+            InputError if the command is unknown or the flags are invalid. Any exception
+            raised by the handlers.
+        """
+        command = self._prepare(parser, input_string)
+        if command is None:
+            return None
+        for delay in self._execute(command):
+            if delay:
+                time.sleep(delay)
+        return command
+
+    def _prepare(self, parser, input_string):
+        """Parse one console line and make its :class:`Command_Context` the context of the
+        calling thread.
+
+        Returns:
+            - :class:`Command` to execute.
+            - None if the line is empty.
+
+        Raises:
+            InputError if the command is unknown, the flags are invalid or a quote is not
+            closed.
+        """
+        stats = self.console._stats
+        if stats is not None:
+            start = time.time()
+        tokens = tokenize_line(input_string)
+        command_name = next(tokens, None)
+        if command_name is None:
+            return None
+
+        command = self.console.console_get_command(command_name)
+        if command is None:
+            raise InputError("Unknown command '%s'. Type 'help' for available commands.",
+                    command_name)
+
+        parser.parse_line(command, tokens, False)
+        self._set_state(Command_Context(command.command_name, parser.get_active_flags(),
+                parser.get_additional_args()))
+        if stats is not None:
+            stats.record("command", command.command_name, "parse", time.time() - start)
+        return command
+
+    def _execute(self, command):
+        """Generator executing the flag handlers and method of the prepared *command*, or
+        starting them as a :class:`Console_Job` if the command runs in the job pool.
+
+        A handler may itself be a generator function. Its generator is run to completion
+        in place, and everything it yields is yielded on: None to hand control back to an
+        event loop, or a number of seconds to sleep before continuing.
+        """
+        context = self._get_state()
+        for map in context.active_flags:
+            if map.longf == "--help":
+                map.method()
+                return
+
+        if command.run_in != COMMAND_RUN_INLINE:
+            job = self.console._console_job_pool().submit(self, command, context,
+                    command.run_in)
+            if job is None:
+                print "\nJob queue is full, '%s' was not started." % command.command_name
+            else:
+                print "\n[%d] %s" % (job.job_id, command.command_name)
+            return
+
+        for delay in self._run_handlers(command):
+            yield delay
+
+    def _run_handlers(self, command, job=None):
+        """Generator executing the flag handlers and method of *command*, see
+        :meth:`_execute`. The return value of the method is stored in *job.result*.
+        """
+        console = self.console
+        stats = console._stats
+        context = self._get_state()
+        for map in context.active_flags:
+            self._set_state(context.for_flag(map))
+            if stats is not None:
+                start = time.time()
+            if map.method == None:
+                result = console.default_flag_handler()
+            else:
+                result = map.method()
+            if stats is not None:
+                name = "%s %s" % (command.command_name, map.longf)
+                if isinstance(result, types.GeneratorType):
+                    result = stats.timed(result, "flag", name, time.time() - start)
+                else:
+                    stats.record("flag", name, "handler", time.time() - start)
+            if isinstance(result, types.GeneratorType):
+                for delay in result:
+                    yield delay
+
+        self._set_state(context)
+        if stats is not None:
+            start = time.time()
+        result = command.method()
+        if stats is not None:
+            if isinstance(result, types.GeneratorType):
+                result = stats.timed(result, "command", command.command_name,
+                        time.time() - start)
+            else:
+                stats.record("command", command.command_name, "handler", time.time() - start)
+        if isinstance(result, types.GeneratorType):
+            for delay in result:
+                yield delay
+        elif job is not None:
+            job.result = result
+
+    def _get_state(self):
+        """Returns the :class:`Command_Context` of the calling thread, see :meth:`_set_state`.
+        """
+        return self.console.current_context
+
+    def _set_state(self, context):
+        """Make *context* (:class:`Command_Context`) the context of the calling thread. Used
+        when switching between interleaved commands and by job workers.
+        """
+        self.console._context_local.context = context
+
+class _Console_Task(object):
+    """Internal. A command scheduled on a :class:`Console_Loop`.
+    """
+    __slots__ = ('generator', 'state', 'output', 'on_done')
+
+    def __init__(self, generator, state, output=None, on_done=None):
+        """
+        Args:
+            - generator (generator): Returned by :meth:`Console_Program._execute`.
+            - state (Command_Context): Context of the command, see
+              :meth:`Console_Program._get_state`.
+
+        Kwargs:
+            - output (): Object with a *write* method receiving everything the command prints
+              to STDOUT. None leaves STDOUT untouched.
+            - on_done (callable method): Called without arguments when the task finishes, fails
+              or is cancelled.
+        """
+        self.generator = generator
+        self.state = state
+        self.output = output
+        self.on_done = on_done
+
+class Console_Loop(Console_Program):
+    """Implements the in-program console on a select() event loop.
+
+    STDIN is read through the loop instead of a blocking raw_input, so the console keeps
+    reading commands while earlier commands run. Command and flag handlers may be generator
+    functions: each *yield* hands control back to the loop, and yielding a number of seconds
+    sleeps without blocking other commands. Up to *max_concurrent* commands run interleaved,
+    further commands wait for a free slot in order of submission. Plain handlers run to
+    completion when called, exactly like in :class:`Console_Program`.
+
+    Calling :meth:`stop`, entering *exit* or a KeyboardInterrupt ends the loop and cancels the
+    running commands by closing their generators (raising GeneratorExit at their current
+    *yield*). End of input ends the loop once all submitted commands are done.
+
+    Only available on platforms where select() supports STDIN (not Windows).
+    """
+    def __init__(self, console_object, DI_console_settings=DI_CONSOLE_IGNORE, max_concurrent=1):
+        """
+        Args:
+            - console_object (Console): Reference to the Console object
+
+        Kwargs:
+            - DI_console_settings (): See :class:`Console_Program`.
+            - max_concurrent (int): Maximum number of commands running interleaved.
+
+        Raises:
+            TypeError, AttributeError, OSError
+        """
+        import collections
+        import itertools
+
+        if not isinstance(max_concurrent, int) or max_concurrent <= 0:
+            raise TypeError("'max_concurrent' argument must be a positive 'int'")
+
+        Console_Program.__init__(self, console_object, DI_console_settings, False)
+        self.max_concurrent = max_concurrent
+        self._wakeup = _Wakeup_Pipe()
+        self._stopping = False
+        self._pending = collections.deque()
+        self._ready = collections.deque()
+        self._sleeping = []
+        self._running = []
+        self._sequence = itertools.count()
+
+    def stop(self):
+        """Stop the loop and cancel all running commands. Safe to call from any thread or a
+        signal handler.
+        """
+        self._stopping = True
+        self._wakeup.wake()
+
+    def run(self):
+        """Run the loop in the calling thread until it is stopped.
+
+        Not initiated directly, but through :meth:`Console.console_run_loop`
+        """
+        import os
+        import select
+        import sys
+
+        parser = _Console_Parser()
+        stdin = sys.stdin.fileno()
+        buffered = ""
+        eof = False
+
+        sys.stdout.write(CONSOLE_PROMPT)
+        sys.stdout.flush()
+        try:
+            while not self._stopping:
+                self._start_pending()
+                if eof and not self._running and not self._pending:
+                    break
+
+                read_fds = [self._wakeup]
+                if not eof:
+                    read_fds.append(stdin)
+                try:
+                    readable = select.select(read_fds, [], [], self._timeout())[0]
+                except select.error as e:
+                    if e.args[0] != errno.EINTR:
+                        raise
+                    continue
+
+                if self._wakeup in readable:
+                    self._wakeup.drain()
+                if stdin in readable:
+                    data = os.read(stdin, 4096)
+                    if not data:
+                        eof = True
+                        lines = [buffered]
+                        buffered = ""
+                    else:
+                        lines = (buffered + data).split("\n")
+                        buffered = lines.pop()
+                    for line in lines:
+                        task = self._submit(parser, line)
+                        if task is not None:
+                            self._pending.append(task)
+                    if lines and not eof and not self._stopping:
+                        sys.stdout.write(CONSOLE_PROMPT)
+                        sys.stdout.flush()
+
+                self._run_ready()
+        except KeyboardInterrupt:
+            self.verbose("Terminating console due to keyboard interrupt.")
+        finally:
+            self._cancel_all()
+            self._wakeup.close()
+            self.console._console_cleanup()
+
+    def _submit(self, parser, line, output=None, on_done=None):
+        """Parse an input line and create its :class:`_Console_Task`. Errors are written to
+        *output*, or STDOUT if None.
+
+        Returns:
+            - The task if the line holds a command to run.
+            - None if the line is empty, invalid or ends the loop.
+        """
+        import sys
+
+        try:
+            command = self._prepare(parser, line)
+        except InputError as e:
+            (output or sys.stdout).write("\n%s" % str(e))
+            return None
+        if command is None:
+            return None
+        if command.command_name == "exit":
+            self._exit_command()
+            return None
+        return _Console_Task(self._execute(command), self._get_state(), output, on_done)
+
+    def _exit_command(self):
+        """Called when *exit* is entered. Ends the loop.
+        """
+        self._stopping = True
+
+    def _start_pending(self):
+        """Move pending tasks to the ready queue while there are free slots.
+        """
+        while self._pending and len(self._running) < self.max_concurrent:
+            task = self._pending.popleft()
+            self._running.append(task)
+            self._ready.append(task)
+
+    def _timeout(self):
+        """Returns the number of seconds the loop may wait for input, None for no limit.
+        """
+        if self._ready:
+            return 0
+        if self._sleeping:
+            return max(0, self._sleeping[0][0] - time.time())
+        return None
+
+    def _run_ready(self):
+        """Wake sleeping tasks that are due and step every ready task once.
+        """
+        import heapq
+
+        now = time.time()
+        while self._sleeping and self._sleeping[0][0] <= now:
+            self._ready.append(heapq.heappop(self._sleeping)[2])
+
+        for i in xrange(len(self._ready)):
+            task = self._ready.popleft()
+            if self._hold(task):
+                continue
+            delay = self._step(task)
+            if delay is False:
+                self._finish(task)
+            elif delay:
+                heapq.heappush(self._sleeping, (now + delay, next(self._sequence), task))
+            else:
+                self._ready.append(task)
+
+    def _hold(self, task):
+        """Returns True to not step the ready *task* now. A held task is no longer in the ready
+        queue and must be put back by whoever held it.
+        """
+        return False
+
+    def _finish(self, task):
+        """Remove a finished or cancelled task.
+        """
+        self._running.remove(task)
+        if task.on_done is not None:
+            task.on_done()
+
+    def _cancel_all(self):
+        """Cancel every running and pending task.
+        """
+        for task in self._running + list(self._pending):
+            self._cancel(task)
+        self._pending.clear()
+
+    def _cancel(self, task):
+        """Cancel *task* by closing its generator.
+        """
+        import heapq
+
+        self._set_state(task.state)
+        previous = _redirect_output(task.output)
+        try:
+            task.generator.close()
+        except Exception as e:
+            self.debug("Closing command '%s' raised %s", task.state.command_name, repr(e))
+        finally:
+            _restore_output(previous)
+        if task in self._running:
+            self._running.remove(task)
+        else:
+            self._pending.remove(task)
+        self._ready = type(self._ready)([t for t in self._ready if t is not task])
+        self._sleeping = [entry for entry in self._sleeping if entry[2] is not task]
+        heapq.heapify(self._sleeping)
+        if task.on_done is not None:
+            task.on_done()
+
+    def _step(self, task):
+        """Run *task* until it yields, with the console attributes it was submitted with and
+        its output routed to *task.output*.
+
+        Returns:
+            - False if the task finished.
+            - Number of seconds to sleep or None, as yielded by the task.
+        """
+        import sys
+
+        self._set_state(task.state)
+        previous = _redirect_output(task.output)
+        try:
+            delay = next(task.generator)
+        except StopIteration:
+            return False
+        except Exception as e:
+            sys.stdout.write("\nCommand '%s' failed: %s" % (task.state.command_name, str(e)))
+            self.debug("Command '%s' raised %s", task.state.command_name, repr(e))
+            return False
+        finally:
+            _restore_output(previous)
+            task.state = self._get_state()
+        return delay
+
+class _Console_Session(object):
+    """Internal. One connection to a :class:`Console_Server`. Receives the STDOUT output of
+    the commands it submits through :meth:`write`.
+    """
+    def __init__(self, connection, address):
+        import collections
+
+        self.connection = connection
+        self.address = address
+        self.input = ""
+        self.output = []
+        self.output_size = 0
+        self.lines = collections.deque()
+        self.task = None
+        self.paused = False
+        self.held = False
+        self.closing = False
+
+    def fileno(self):
+        return self.connection.fileno()
+
+    def write(self, data):
+        if isinstance(data, unicode):
+            data = data.encode("utf-8")
+        self.output.append(data)
+        self.output_size += len(data)
+
+    def flush(self):
+        pass
+
+class _Poller(object):
+    """Internal. Minimal wrapper around poll(), falling back to select() where poll() is not
+    available.
+    """
+    def __init__(self):
+        import select
+
+        self._fds = {}
+        self._poll = None
+        if hasattr(select, 'poll'):
+            self._poll = select.poll()
+
+    def register(self, fd, read=True, write=False):
+        """Register *fd*, or change the events of an already registered *fd*.
+        """
+        import select
+
+        if self._fds.get(fd) == (read, write):
+            return
+        self._fds[fd] = (read, write)
+        if self._poll is not None:
+            events = 0
+            if read:
+                events |= select.POLLIN | select.POLLPRI
+            if write:
+                events |= select.POLLOUT
+            self._poll.register(fd, events)
+
+    def unregister(self, fd):
+        if self._fds.pop(fd, None) is not None and self._poll is not None:
+            self._poll.unregister(fd)
+
+    def poll(self, timeout):
+        """Wait at most *timeout* seconds (None for no limit) for registered events.
+
+        Returns:
+            List of tuples (fd, readable (bool), writable (bool)). Errors and hangups are
+            reported as readable.
+        """
+        import select
+
+        try:
+            if self._poll is not None:
+                if timeout is not None:
+                    timeout = int(timeout * 1000)
+                events = self._poll.poll(timeout)
+                return [(fd, not not event & ~select.POLLOUT, not not event & select.POLLOUT)
+                        for (fd, event) in events]
+            read_fds = [fd for (fd, (read, write)) in self._fds.items() if read]
+            write_fds = [fd for (fd, (read, write)) in self._fds.items() if write]
+            (readable, writable, error) = select.select(read_fds, write_fds, [], timeout)
+        except select.error as e:
+            if e.args[0] != errno.EINTR:
+                raise
+            return []
+        writable = set(writable)
+        events = [(fd, True, fd in writable) for fd in readable]
+        events.extend([(fd, False, True) for fd in writable.difference(readable)])
+        return events
+
+class Console_Server(Console_Loop):
+    """Serves the commands of a :class:`Console` to many concurrent connections over a Unix
+    domain socket or TCP, all handled by one poll() event loop.
+
+    Each connection is a session with its own prompt (*CONSOLE_PROMPT*), its own
+    *current_command_* attributes and its own output: everything a command prints to STDOUT
+    while it runs for a session is sent to that session only. A session runs its commands one
+    at a time in the order they arrive; commands of different sessions run interleaved like in
+    :class:`Console_Loop`, up to *max_concurrent* at once. *exit* closes the session.
+
+    Output is buffered per session. When a session has more than *output_limit* bytes
+    waiting to be sent, the server stops reading its input and stops running its command (at
+    the next *yield*) until the client has caught up.
+
+    .. note::
+        Plain (non generator) handlers block the whole server while they run, write long
+        running commands as generator functions.
+    """
+    def __init__(self, console_object, address, DI_console_settings=DI_CONSOLE_IGNORE,
+            max_concurrent=CONSOLE_SERVER_MAX_CONCURRENT, max_sessions=CONSOLE_SERVER_MAX_SESSIONS,
+            output_limit=CONSOLE_SERVER_OUTPUT_LIMIT):
+        """
+        Args:
+            - console_object (Console): Reference to the Console object
+            - address (): Path (str) of a Unix domain socket, or (host, port) tuple for TCP.
+
+        Kwargs:
+            - DI_console_settings (): See :class:`Console_Program`.
+            - max_concurrent (int): Maximum number of commands running interleaved.
+            - max_sessions (int): Connections beyond this number are refused.
+            - output_limit (int): Bytes of unsent output per session before its input and
+              command are paused.
+
+        Raises:
+            TypeError, AttributeError, OSError
+        """
+        if not isinstance(address, (str, tuple)):
+            raise TypeError("'address' argument must be a path 'str' or (host, port) 'tuple'")
+        if not isinstance(max_sessions, int) or max_sessions <= 0:
+            raise TypeError("'max_sessions' argument must be a positive 'int'")
+        if not isinstance(output_limit, int) or output_limit <= 0:
+            raise TypeError("'output_limit' argument must be a positive 'int'")
+
+        Console_Loop.__init__(self, console_object, DI_console_settings, max_concurrent)
+        self.address = address
+        self.max_sessions = max_sessions
+        self.output_limit = output_limit
+        self._sessions = {}
+        self._exit_requested = False
+
+    def run(self):
+        """Serve sessions in the calling thread until :meth:`stop` is called.
+
+        Not initiated directly, but through :meth:`Console.console_serve`
+        """
+        import socket
+
+        parser = _Console_Parser()
+        listener = self._listen()
+        poller = _Poller()
+        poller.register(listener.fileno())
+        poller.register(self._wakeup.fileno())
+        self.verbose("Console server listening on %s", str(self.address))
+        try:
+            while not self._stopping:
+                self._start_pending()
+                for (fd, session) in self._sessions.items():
+                    if session.closing and not session.output:
+                        poller.unregister(fd)
+                        self._close_session(session)
+                        continue
+                    if session.output_size <= self.output_limit // 4:
+                        session.paused = False
+                        if session.held:
+                            session.held = False
+                            self._ready.append(session.task)
+                    poller.register(fd, not session.paused and not session.closing,
+                            session.output_size > 0)
+
+                for (fd, readable, writable) in poller.poll(self._timeout()):
+                    if fd == listener.fileno():
+                        self._accept(listener)
+                        continue
+                    if fd == self._wakeup.fileno():
+                        self._wakeup.drain()
+                        continue
+                    session = self._sessions.get(fd)
+                    if session is None:
+                        continue
+                    try:
+                        if writable:
+                            self._send(session)
+                        if readable and not session.closing:
+                            self._receive(parser, session)
+                    except socket.error as e:
+                        self.debug("Session %s failed: %s", str(session.address), str(e))
+                        poller.unregister(fd)
+                        self._close_session(session)
+
+                self._run_ready()
+        except KeyboardInterrupt:
+            self.verbose("Terminating console server due to keyboard interrupt.")
+        finally:
+            for session in self._sessions.values():
+                session.closing = True
+            self._cancel_all()
+            for session in self._sessions.values():
+                self._close_session(session)
+            listener.close()
+            if isinstance(self.address, str):
+                self._unlink_socket()
+            self._wakeup.close()
+            self.console._console_cleanup()
+
+    def _listen(self):
+        """Create the non-blocking listening socket.
+        """
+        import socket
+
+        if isinstance(self.address, str):
+            self._unlink_socket()
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(self.address)
+        listener.listen(socket.SOMAXCONN)
+        listener.setblocking(0)
+        return listener
+
+    def _unlink_socket(self):
+        """Remove a Unix domain socket left at *address*. Other files are left alone.
+        """
+        import os
+        import stat
+
+        try:
+            if stat.S_ISSOCK(os.stat(self.address).st_mode):
+                os.unlink(self.address)
+        except OSError as exception:
+            if exception.errno != errno.ENOENT:
+                raise
+
+    def _accept(self, listener):
+        """Accept all waiting connections.
+        """
+        import socket
+
+        while True:
+            try:
+                (connection, address) = listener.accept()
+            except socket.error as e:
+                if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                    return
+                raise
+            if len(self._sessions) >= self.max_sessions:
+                connection.close()
+                self.debug("Refused connection, %d sessions open", len(self._sessions))
+                continue
+            connection.setblocking(0)
+            session = _Console_Session(connection, address)
+            self._sessions[connection.fileno()] = session
+            session.write(CONSOLE_PROMPT)
+
+    def _receive(self, parser, session):
+        """Read available input of *session* and queue its complete lines.
+        """
+        import socket
+
+        try:
+            data = session.connection.recv(4096)
+        except socket.error as e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return
+            raise
+        if not data:
+            #Client closed its end, finish the queued commands' output first
+            session.closing = True
+            session.lines.clear()
+            if session.task is not None:
+                self._cancel(session.task)
+            return
+
+        lines = (session.input + data).split("\n")
+        session.input = lines.pop()
+        if len(session.input) > CONSOLE_SERVER_LINE_LIMIT:
+            session.write("\nLine too long.")
+            session.closing = True
+            return
+        session.lines.extend(lines)
+        self._session_next(parser, session)
+        if session.output_size > self.output_limit:
+            session.paused = True
+
+    def _send(self, session):
+        """Send as much of the buffered output of *session* as the socket accepts.
+        """
+        import socket
+
+        data = "".join(session.output)
+        try:
+            sent = session.connection.send(data)
+        except socket.error as e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return
+            raise
+        data = data[sent:]
+        session.output = [data] if data else []
+        session.output_size = len(data)
+
+    def _hold(self, task):
+        """Hold the command of a session with more than *output_limit* bytes of unsent output,
+        it is made ready again in :meth:`run` when the output has drained.
+        """
+        session = task.output
+        if session is None or session.output_size <= self.output_limit:
+            return False
+        session.held = True
+        session.paused = True
+        return True
+
+    def _session_next(self, parser, session):
+        """Submit the next queued line of *session* if it has no command running.
+        """
+        while session.task is None and session.lines and not session.closing:
+            line = session.lines.popleft()
+            self._exit_requested = False
+            task = self._submit(parser, line.rstrip("\r"), session,
+                    lambda: self._session_done(parser, session))
+            if self._exit_requested:
+                session.closing = True
+                session.lines.clear()
+            elif task is None:
+                session.write(CONSOLE_PROMPT)
+            else:
+                session.task = task
+                self._pending.append(task)
+
+    def _session_done(self, parser, session):
+        """Called when the running command of *session* finishes or is cancelled.
+        """
+        session.task = None
+        session.held = False
+        if not session.closing:
+            session.write(CONSOLE_PROMPT)
+            self._session_next(parser, session)
+
+    def _exit_command(self):
+        """*exit* closes the session entering it, not the server.
+        """
+        self._exit_requested = True
+
+    def _close_session(self, session):
+        """Cancel the command of *session* and close its connection.
+        """
+        session.closing = True
+        if session.task is not None:
+            self._cancel(session.task)
+        self._sessions.pop(session.fileno(), None)
+        session.connection.close()
+
+class Console_Client(object):
+    """Client for a :class:`Console_Server`. Sends command lines and returns their output.
+    """
+    def __init__(self, address, timeout=None):
+        """
+        Args:
+            - address (): Path (str) of a Unix domain socket, or (host, port) tuple for TCP.
+
+        Kwargs:
+            - timeout (float): Seconds to wait for the server, None waits forever.
+
+        Raises:
+            socket.error
+        """
+        import socket
+
+        if isinstance(address, str):
+            self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.connection.settimeout(timeout)
+        self.connection.connect(address)
+        self._buffer = ""
+        self._read_prompt()
+
+    def execute(self, line):
+        """Execute one command line on the server.
+
+        Returns:
+            The output of the command (str), without the prompt.
+
+        Raises:
+            socket.error
+        """
+        self.connection.sendall(line + "\n")
+        return self._read_prompt()
+
+    def interact(self):
+        """Run an interactive console reading command lines from the terminal until *exit*,
+        end of input or the server closes the connection.
+        """
+        import sys
+
+        sys.stdout.write(CONSOLE_PROMPT)
+        while self.connection is not None:
+            try:
+                line = raw_input()
+            except EOFError:
+                break
+            sys.stdout.write(self.execute(line))
+            if self.connection is not None:
+                sys.stdout.write(CONSOLE_PROMPT)
+        self.close()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def _read_prompt(self):
+        """Receive until the server sends its prompt or closes the connection.
+        """
+        while not self._buffer.endswith(CONSOLE_PROMPT):
+            data = self.connection.recv(65536)
+            if not data:
+                self.close()
+                break
+            self._buffer += data
+        output = self._buffer
+        self._buffer = ""
+        if output.endswith(CONSOLE_PROMPT):
+            output = output[:-len(CONSOLE_PROMPT)]
+        return output
+
+class Console_Job(object):
+    """A command running in the background on the job pool of a :class:`Console`, see
+    :meth:`Console.console_add_command` *run_in*.
+
+    Attributes:
+        - self.job_id (int): Number identifying the job in the *jobs*, *wait* and *cancel*
+          console commands.
+        - self.command_name (str): Name of the command.
+        - self.status (str): One of *JOB_QUEUED*, *JOB_RUNNING*, *JOB_DONE*, *JOB_FAILED* or
+          *JOB_CANCELLED*.
+        - self.result (): Return value of the command method. For process jobs, the value must
+          be picklable, otherwise its repr is stored.
+        - self.error (str): Description of the exception that failed the job, or None.
+        - self.submitted, self.started, self.finished (float): Timestamps, None until reached.
+    """
+    def __init__(self, job_id, program, command, state, run_in):
+        self.job_id = job_id
+        self.command_name = command.command_name
+        self.status = JOB_QUEUED
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._program = program
+        self._command = command
+        self._state = state
+        self._run_in = run_in
+        self._output = []
+        self._cancel_requested = False
+        self._process = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def output(self):
+        """Everything the job printed to STDOUT so far (str).
+        """
+        return "".join(self._output)
+
+    def write(self, data):
+        if isinstance(data, unicode):
+            data = data.encode("utf-8")
+        self._output.append(data)
+
+    def flush(self):
+        pass
 
-            self.terminal_add_flag(flag_list[0], shortf_list[i], input=input_type)
-            i += 1
+    def done(self):
+        """Returns True if the job finished, failed or was cancelled.
+        """
+        return self._done.is_set()
 
-    def terminal_process_flags(self):
-        """Attempts to process terminal flag options and initialize :class:`Display_Information`.
-        This will fail if terminal flags have already been processed. This method is
-        automatically called internally if :class:`Console` initialization parameter
-        *disable_auto_process_flags* is not set.
+    def wait(self, timeout=None):
+        """Block until the job is done or *timeout* seconds passed.
 
-        .. note::
-            This method should **ONLY** be called when :class:`Console` is initialized with
-            *disable_auto_process_flags*. If called after terminal flags have been processed,
-            a **CallError** will be raised. Simailary if called twise.
+        Returns:
+            True if the job is done.
+        """
+        self._done.wait(timeout)
+        return self._done.is_set()
 
+    def cancel(self):
+        """Cancel the job. A queued job never runs and a process job is terminated. A thread
+        job written as a generator function is closed at its next yield; other thread jobs
+        can not be interrupted, they run to completion and their result is discarded.
+        """
+        with self._lock:
+            self._cancel_requested = True
+            if self.status == JOB_QUEUED:
+                self._finish(JOB_CANCELLED)
+            elif self._process is not None:
+                self._process.terminate()
+
+    def _run(self):
+        """Run the job in the calling worker thread.
+        """
+        with self._lock:
+            if self._cancel_requested:
+                return
+            self.status = JOB_RUNNING
+            self.started = time.time()
+        try:
+            if self._run_in == COMMAND_RUN_PROCESS:
+                self._run_process()
+            else:
+                self._run_thread()
+        except Exception as e:
+            self.error = "%s: %s" % (type(e).__name__, str(e))
+            self._finish(JOB_FAILED)
+        else:
+            self._finish(JOB_CANCELLED if self._cancel_requested else JOB_DONE)
 
-        Raises:
-            CallError
+    def _run_thread(self):
+        program = self._program
+        program._set_state(self._state)
+        previous = _redirect_output(self)
+        try:
+            generator = program._run_handlers(self._command, self)
+            try:
+                for delay in generator:
+                    if self._cancel_requested:
+                        break
+                    if delay:
+                        time.sleep(delay)
+            finally:
+                generator.close()
+        finally:
+            _restore_output(previous)
+
+    def _run_process(self):
+        import multiprocessing
+
+        (receiver, sender) = multiprocessing.Pipe(False)
+        with self._lock:
+            if self._cancel_requested:
+                sender.close()
+                receiver.close()
+                return
+            process = multiprocessing.Process(target=_run_process_job, args=(self, sender))
+            process.daemon = True
+            _before_fork()
+            try:
+                process.start()
+            finally:
+                _after_fork(False)
+            self._process = process
+        sender.close()
+        try:
+            (output, result, error) = receiver.recv()
+        except EOFError:
+            self._process.join()
+            if self._cancel_requested:
+                return
+            raise RuntimeError("Process exited with code %s" % str(self._process.exitcode))
+        finally:
+            receiver.close()
+        self._process.join()
+        self.write(output)
+        self.result = result
+        if error is not None:
+            self.error = error
+            self._finish(JOB_FAILED)
+
+    def _finish(self, status):
+        if self._done.is_set():
+            return
+        if status == JOB_CANCELLED:
+            self.result = None
+        self.status = status
+        self.finished = time.time()
+        self._program = None
+        self._done.set()
+
+def _run_process_job(job, sender):
+    """Internal. Entry point of a process job, runs in the forked child process and sends
+    (output, result, error) back through *sender*.
+    """
+    import sys
+    import pickle
+
+    _after_fork(True)
+    #Statistics recorded here would be lost with the process
+    job._program.console._stats = None
+    error = None
+    sys.stdout = job
+    try:
+        job._program._set_state(job._state)
+        for delay in job._program._run_handlers(job._command, job):
+            if delay:
+                time.sleep(delay)
+    except Exception as e:
+        error = "%s: %s" % (type(e).__name__, str(e))
+    finally:
+        sys.stdout = sys.__stdout__
+    #The process ends without running atexit handlers, write its log records now
+    try:
+        flush_log_sinks()
+    except Exception as e:
+        if error is None:
+            error = "%s: %s" % (type(e).__name__, str(e))
+    try:
+        pickle.dumps(job.result, pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError):
+        job.result = repr(job.result)
+    sender.send((job.output, job.result, error))
+    sender.close()
+
+class _Job_Pool(object):
+    """Internal. Worker threads running :class:`Console_Job` objects from a bounded queue.
+    """
+    def __init__(self, workers=CONSOLE_JOB_WORKERS, queue_size=CONSOLE_JOB_QUEUE_SIZE,
+            history=CONSOLE_JOB_HISTORY):
+        import Queue
+        import collections
+
+        self.workers = workers
+        self._queue = Queue.Queue(queue_size)
+        self._jobs = {}
+        self._finished = collections.deque()
+        self._history = history
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._threads = []
+        self._closing = False
+
+    def submit(self, program, command, state, run_in):
+        """Queue a job.
+
+        Returns:
+            - :class:`Console_Job`
+            - None if the queue is full.
         """
-        if self._processed_flag_options:
-            raise CallError("Programming Error: Terminal has already parsed flag inputs. "
-                "If you ment to call this method you probably need to initialize Console with "
-                "disable_auto_process_flags")
-        self._terminal_process_flags()
+        import Queue
 
-    def _terminal_process_flags(self):
+        with self._lock:
+            job = Console_Job(self._next_id, program, command, state, run_in)
+            try:
+                self._queue.put_nowait(job)
+            except Queue.Full:
+                return None
+            self._next_id += 1
+            self._jobs[job.job_id] = job
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name="Console_Job_Worker")
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Returns all known jobs, ordered by job id.
         """
-        Process the terminal input line and execute the methods associated with present flags
+        with self._lock:
+            return [self._jobs[job_id] for job_id in sorted(self._jobs)]
 
-        Modules:
-            sys
+    def close(self, timeout=1.0):
+        """Cancel every job and stop the workers, waiting at most *timeout* seconds for them.
+        Workers running a thread job that can not be interrupted are left to finish on their
+        own.
         """
-        import sys
-        self._processed_flag_options = True
+        import Queue
 
-        parser = _Console_Parser()
-        parser.parse_line(self.terminal, sys.argv, False)
-        self.terminal_active_flags = parser.get_active_flags()
-        self.terminal_additional_args = parser.get_additional_args()
+        self._closing = True
+        for job in self.jobs():
+            job.cancel()
+        #The queued jobs are cancelled now, drop them to make room for the stop markers
+        while True:
+            try:
+                self._queue.get_nowait()
+            except Queue.Empty:
+                break
+        for thread in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except Queue.Full:
+                #A job submitted meanwhile, workers also stop on self._closing
+                break
+        deadline = time.time() + timeout
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.time()))
+        self._threads = []
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None or self._closing:
+                return
+            job._run()
+            with self._lock:
+                self._finished.append(job.job_id)
+                while len(self._finished) > self._history:
+                    self._jobs.pop(self._finished.popleft(), None)
+
+class _Thread_Output(object):
+    """Internal. Replaces sys.stdout and routes writes to a per thread target, so output of
+    commands run for a network session or a background job ends up there instead of the
+    terminal. Threads without a target write to the original STDOUT.
+    """
+    def __init__(self, stdout):
+        import thread
 
+        self._stdout = stdout
+        self._targets = {}
+        self._get_ident = thread.get_ident
 
-        def _update_active_DI(level):
-            for map in self.terminal_active_flags:
-                flag = map["longf"]
-                if flag == "--verbose":
-                    self._DI_settings["verbose"] = level
-                elif flag == "--debug":
-                    self._DI_settings["debug"] = level
-                elif flag == "--verbose-debug":
-                    self._DI_settings["verbosedebug"] = level
+    def _target(self):
+        return self._targets.get(self._get_ident(), self._stdout)
 
-        do_exit = False
-        exit_map = None
-        log_level = DI_STDOUT
-        for map in self.terminal_active_flags:
-            flag = map["longf"]
-            if flag == "--help":
-                exit_map = map
-                do_exit = True
-            elif flag == "--log":
-                _update_active_DI(DI_LOG)
-            elif flag == "--log-stdout":
-                _update_active_DI(DI_STDOUT_LOG)
-            elif flag == "--verbose":
-                self._DI_settings["verbose"] = DI_STDOUT
-            elif flag == "--debug":
-                self._DI_settings["debug"] = DI_STDOUT
-            elif flag == "--verbose-debug":
-                self._DI_settings["debug"] = DI_STDOUT
-                self._DI_settings["verbosedebug"] = DI_STDOUT
+    def write(self, data):
+        self._target().write(data)
 
-        if do_exit:
-            exit_map["method"]()
-            sys.exit()
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
 
-        Display_Information.__init__(self, self._DI_settings)
+    def flush(self):
+        target = self._target()
+        if hasattr(target, 'flush'):
+            target.flush()
 
-        #Call flags in order of apperance in string
-        self.current_command_name = "TERMINAL"
-        self.current_command_active_flags = self.terminal_active_flags
-        self.current_command_additional_args = self.terminal_additional_args
-        for map in self.terminal_active_flags:
-            self.current_flag_name = map["longf"]
-            self.current_flag_input = map["input"]
-            if map["method"] == None:
-                self.default_flag_handler()
-            else:
-                map["method"]()
+    def __getattr__(self, name):
+        return getattr(self._stdout, name)
 
-    def _add_default_flags(self):
-        """Assist function to add all default flags
-        """
-        self.terminal.add_flag("--log", "-l",
-                "Route all -v, -d & -D print to logfile instead of STDOUT.")
-        self.terminal.add_flag("--log-stdout", "-L",
-                "Route all -v, -d & -D print to both logfile and STDOUT.")
-        self.terminal.add_flag("--verbose", "-v", "Print detailed program flow to STDOUT.")
-        self.terminal.add_flag("--debug", "-d",
-                "Print debug information in program flow to STDOUT.")
-        self.terminal.add_flag("--verbose-debug", "-D",
-                "Print detailed debug information in program flow to STDOUT.")
+_thread_output = None
+_thread_output_lock = threading.Lock()
 
-    def _console_help(self):
-        """Print all available commands from the console
+def _redirect_output(target):
+    """Route STDOUT writes of the current thread to *target* (an object with a *write* method)
+    until :func:`_restore_output` is called with the returned value. A *target* of None leaves
+    the routing unchanged.
+    """
+    global _thread_output
+    import sys
+
+    if target is None:
+        return None
+    with _thread_output_lock:
+        if _thread_output is None:
+            _thread_output = _Thread_Output(sys.stdout)
+            sys.stdout = _thread_output
+    ident = _thread_output._get_ident()
+    previous = _thread_output._targets.get(ident)
+    _thread_output._targets[ident] = target
+    return (ident, previous)
+
+def _restore_output(previous):
+    """Undo :func:`_redirect_output`.
+    """
+    if previous is None:
+        return
+    (ident, target) = previous
+    if target is None:
+        _thread_output._targets.pop(ident, None)
+    else:
+        _thread_output._targets[ident] = target
+
+class _Shutdown_Event(object):
+    """Internal. threading.Event mirrored by a pipe that is readable while the event is set, so
+    threads can wait for it in select() together with other files. Returned by
+    :meth:`Console.console_start`.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._pipe = None
+
+    def fileno(self):
+        """Returns the read end of the pipe, created on first use. Not available on Windows.
         """
+        with self._lock:
+            if self._pipe is None:
+                self._pipe = _Wakeup_Pipe()
+                if self._event.is_set():
+                    self._pipe.wake()
+            return self._pipe.fileno()
+
+    def is_set(self):
+        return self._event.is_set()
+
+    isSet = is_set
+
+    def set(self):
+        self._event.set()
+        with self._lock:
+            if self._pipe is not None:
+                self._pipe.wake()
+
+    def clear(self):
+        with self._lock:
+            self._event.clear()
+            if self._pipe is not None:
+                self._pipe.drain()
+
+    def wait(self, timeout=None):
+        """Block until the event is set or *timeout* seconds passed. Without a timeout the wait
+        is a select() on the pipe where available, which, unlike threading.Event.wait, is
+        interrupted by KeyboardInterrupt in the main thread.
 
-        print_help = _Print_Help_Console(self)
-        print_help.print_help(self._available_commands, False)
+        Returns:
+            True if the event is set.
+        """
+        import os
 
-    def _dummy(self):
-        pass
+        if timeout is not None or os.name != 'posix':
+            return self._event.wait(timeout)
+        import select
 
-class Console_Program(threading.Thread, Display_Information):
-    """Implements the in-program console loop
+        while not self._event.is_set():
+            try:
+                select.select([self], [], [])
+            except select.error as e:
+                if e.args[0] != errno.EINTR:
+                    raise
+        return True
+
+class _Wakeup_Pipe(object):
+    """Internal. Self-pipe used to wake a thread blocked in select() from another thread or a
+    signal handler.
     """
-    def __init__(self, console_object, DI_console_settings=DI_CONSOLE_IGNORE, is_thread=True):
+    def __init__(self):
         """
-        Args:
-            - console_object (Console): Reference to the Console object
+        Raises:
+            OSError
+        """
+        import fcntl
+        import os
 
-        Kwargs:
-            - DI_console_settings (): Can be one of these values:
-                * *(dict)* with the original settings needed for :class:`Display_Information`
-                * *(int)* flag
-                    1. **DI_CONSOLE_IGNORE** - Set all settings to *ignore*.
-                    2. **DI_CONSOLE_IHERIT** - Inherit all DI settings from console
-            - is_thread (bool): Determine whether or not the in-program console should start
-              as a thread.
+        (self._read_fd, self._write_fd) = os.pipe()
+        for fd in (self._read_fd, self._write_fd):
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
 
-        Raises:
-            TypeError, AttributeError
+    def fileno(self):
+        return self._read_fd
+
+    def wake(self):
+        """Make the read end readable. Never blocks.
         """
+        import os
 
-        if is_thread:
-            threading.Thread.__init__(self)
+        try:
+            os.write(self._write_fd, "x")
+        except OSError as exception:
+            #Pipe full: The reader is already due to wake up
+            if exception.errno not in (errno.EAGAIN, errno.EBADF):
+                raise
 
-        if isinstance(console_object, Console) == False:
-            raise TypeError("Input object is not instance of class Console")
-        self.console = console_object
+    def drain(self):
+        """Consume all pending wakeups.
+        """
+        import os
 
-        DI_init = None
-        if isinstance(DI_console_settings, int):
-            if DI_console_settings == DI_CONSOLE_IGNORE:
-                DI_init = None
-            elif DI_console_settings == DI_CONSOLE_INHERIT:
-                DI_init = self.console.display_information_settings
-            else:
-                raise AttributeError("Argument 'DI_console_settings' integer flag values are "
-                        "out of bounds. No valid flag.")
-        elif isinstance(DI_console_settings, dict):
-            DI_init = DI_console_settings
-        else:
-            raise TypeError("Argument 'DI_console_settings' is not of supported input types: "
-                    "'int'(flags) or 'dict'")
+        try:
+            while os.read(self._read_fd, 4096):
+                pass
+        except OSError as exception:
+            if exception.errno != errno.EAGAIN:
+                raise
 
-        self.shutdown = threading.Event()
+    def close(self):
+        import os
 
-        Display_Information.__init__(self, DI_init)
+        for fd in (self._read_fd, self._write_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
 
-    def run(self):
-        """Method starts the in-program console.
+class _Prefix_Trie(object):
+    """Internal. Maps string keys to values and answers prefix queries in time proportional to
+    the length of the prefix.
+    """
+    def __init__(self):
+        """
+        Each node is a list [children (dict), keys (sorted list of all keys below the node)].
+        """
+        self._root = [{}, []]
+        self._values = {}
 
-        Not initiated directly, but through :meth:`Console.console_start`
+    def insert(self, key, value):
+        """Add *key* with *value*, replacing the value if *key* is present.
         """
-        import sys
-        do_loop = True
-        parser = _Console_Parser()
+        import bisect
 
-        while do_loop:
-            try:
-                if self.shutdown.is_set():
-                    raise KeyboardInterrupt
+        is_new = key not in self._values
+        self._values[key] = value
+        if not is_new:
+            return
+        node = self._root
+        bisect.insort(node[1], key)
+        for char in key:
+            node = node[0].setdefault(char, [{}, []])
+            bisect.insort(node[1], key)
+
+    def get(self, key, default=None):
+        """Returns the value of *key*, or *default* if not present.
+        """
+        return self._values.get(key, default)
 
-                input_string = raw_input("\n # ")
-                input_list = input_string.split()
-                if len(input_list) <= 0:
-                    continue
+    def keys(self, prefix=""):
+        """Returns a sorted list of all keys starting with *prefix*. Do not modify it.
+        """
+        node = self._root
+        for char in prefix:
+            node = node[0].get(char)
+            if node is None:
+                return []
+        return node[1]
+
+    def unique(self, prefix):
+        """Returns the value all keys starting with *prefix* map to, or None if there are none
+        or they map to different values.
+        """
+        keys = self.keys(prefix)
+        if not keys:
+            return None
+        value = self._values[keys[0]]
+        for key in keys:
+            if self._values[key] is not value:
+                return None
+        return value
 
-                command_found = False
-                for command in self.console._available_commands:
-                    if command.command_name == input_list[0]:
-                        command_found = True
-                        parser.parse_line(command, input_string)
-                        break
+class _Console_Completer(object):
+    """Internal. Completes console lines from the prefix tries of the console and its commands:
+    command names and aliases first, then the flags of the entered command. Where a flag
+    value is expected, a hint of its FLAG_INPUT_ type is given instead.
+    """
 
-                if command_found:
-                    self.console.command_active_flags = parser.get_active_flags()
-                    self.console.command_additional_args = parser.get_additional_args()
-                    self.console.command_name = command.command_name
-
-                    do_exit = False
-                    for map in self.console.command_active_flags:
-                        if map["longf"] == "--help":
-                            do_exit = True
-                            break
-                    if do_exit:
-                        map["method"]()
-                        continue
+    def __init__(self, console):
+        self.console = console
+
+    def matches(self, line, begidx, text):
+        """Complete *text*, the token starting at *begidx* of *line*.
+
+        Returns:
+            Tuple (matches (list), hint (str or None)). Do not modify *matches*.
+        """
+        before = line[:begidx].split()
+        if not before:
+            return (self.console._command_trie.keys(text), None)
+        command = self.console.console_get_command(before[0])
+        if command is None:
+            return ([], None)
+        if len(before) > 1:
+            flag = command._flag_index.get(before[-1])
+            if flag is not None and flag.input in _flag_inputs:
+                return ([], "<%s> value of %s" % (_flag_inputs[flag.input][0], flag.longf))
+        if text == "" or text[0] == '-':
+            return (command._get_flag_trie().keys(text), None)
+        return ([], None)
+
+    def describe(self, line, match):
+        """Returns *match* of *line* as listed to the user, flags with their input type.
+        """
+        before = line.split()
+        if not before:
+            return match
+        command = self.console.console_get_command(before[0])
+        if command is None or match[:1] != '-':
+            return match
+        flag = command._flag_index.get(match)
+        if flag is None or flag.input not in _flag_inputs:
+            return match
+        return "%s <%s>" % (match, _flag_inputs[flag.input][0])
+
+class _Console_Readline(object):
+    """Internal. Tab completion and bounded, persistent history for :meth:`Console_Program.run`
+    through the optional *readline* module.
+    """
+    def __init__(self, console, history_file=None, history_length=CONSOLE_HISTORY_LENGTH):
+        """
+        Raises:
+            ImportError if readline is not available.
+        """
+        import readline
+
+        self.readline = readline
+        self.completer = _Console_Completer(console)
+        self.history_file = history_file
+        self.history_length = history_length
+        self._matches = []
+        self._previous = None
+        self._history = None
+
+    def install(self):
+        """Make this the readline completer and load the history file.
+        """
+        readline = self.readline
+        self._previous = (readline.get_completer(), readline.get_completer_delims())
+        readline.set_completer(self.complete)
+        #Flags start with '-', which readline treats as a delimiter by default
+        readline.set_completer_delims(" \t\n")
+        if 'libedit' in (readline.__doc__ or ""):
+            readline.parse_and_bind("bind ^I rl_complete")
+        else:
+            readline.parse_and_bind("tab: complete")
+        if hasattr(readline, 'set_completion_display_matches_hook'):
+            readline.set_completion_display_matches_hook(self.display_matches)
+        if self.history_file is not None:
+            self._load_history()
+
+    def uninstall(self):
+        """Restore the completer in place before :meth:`install`.
+        """
+        readline = self.readline
+        if self._previous is not None:
+            readline.set_completer(self._previous[0])
+            readline.set_completer_delims(self._previous[1])
+            self._previous = None
+        if hasattr(readline, 'set_completion_display_matches_hook'):
+            readline.set_completion_display_matches_hook(None)
+        if self._history is not None:
+            self._history.close()
+            self._history = None
+
+    def add_history(self, line):
+        """Called with every entered line, which raw_input already added to the readline
+        history. Appends it to the history file and drops the oldest lines beyond
+        *history_length*.
+        """
+        if not line.strip():
+            return
+        readline = self.readline
+        while readline.get_current_history_length() > self.history_length:
+            readline.remove_history_item(0)
+        if self._history is not None:
+            self._history.write(line.replace("\n", " ") + "\n")
+            self._history.flush()
+
+    def complete(self, text, state):
+        """readline completer function.
+        """
+        if state == 0:
+            readline = self.readline
+            line = readline.get_line_buffer()
+            (self._matches, hint) = self.completer.matches(line, readline.get_begidx(), text)
+            if hint is not None:
+                self._show([hint], line)
+        if state < len(self._matches):
+            if len(self._matches) == 1:
+                #Python's readline module does not append a space to a unique completion
+                return self._matches[0] + " "
+            return self._matches[state]
+        return None
+
+    def display_matches(self, substitution, matches, longest_match_length):
+        """readline hook listing the matches, with the input types of flags.
+        """
+        line = self.readline.get_line_buffer()
+        self._show([self.completer.describe(line, match) for match in matches], line)
 
-                    for map in self.console.command_active_flags:
-                        self.console.current_flag_input = map['input']
-                        self.console.current_flag_name = map['longf']
-                        map['method']()
+    def _show(self, items, line):
+        """Print *items* in columns below the input line and redraw the prompt.
+        """
+        import sys
 
-                    command.method()
-                    if input_list[0] == "exit":
-                        do_loop = False
+        width = get_terminal_size().width
+        column = max(len(item) for item in items) + 2
+        per_row = max(1, width // column)
+        rows = ["".join(item.ljust(column) for item in items[i:i + per_row]).rstrip()
+                for i in xrange(0, len(items), per_row)]
+        sys.stdout.write("\n" + "\n".join(rows) + "\n" + CONSOLE_PROMPT.split("\n")[-1] + line)
+        sys.stdout.flush()
+        self.readline.redisplay()
+
+    def _load_history(self):
+        """Read the last *history_length* lines of the history file into readline and open it
+        for appending. A file grown beyond twice that length is rewritten.
+        """
+        import collections
 
+        try:
+            with open(self.history_file, "r") as f:
+                count = 0
+                lines = collections.deque(maxlen=self.history_length)
+                for line in f:
+                    count += 1
+                    lines.append(line)
+        except IOError as exception:
+            if exception.errno != errno.ENOENT:
+                raise
+            count = 0
+            lines = []
+        if count > 2 * self.history_length:
+            with open(self.history_file, "w") as f:
+                f.writelines(lines)
+        for line in lines:
+            self.readline.add_history(line.rstrip("\n"))
+        self._history = open(self.history_file, "a")
+
+def tokenize_line(line):
+    """Generator splitting a console line into tokens at whitespace, in one pass over the line.
+
+    Quoting follows the shell: text inside single quotes is taken literally, inside double
+    quotes a backslash escapes '"' and '\\', and outside quotes a backslash escapes any
+    character. Quotes may be combined with plain text in one token, eg. *--name="a b"*.
+
+    Scanning is done by str.split and str.find, so long lines and large arguments are
+    tokenized at C speed. Lines without quotes or backslashes take a str.split fast path.
+
+    Raises:
+        InputError if a quote is not closed or the line ends with a backslash.
+    """
+    if '"' not in line and "'" not in line and '\\' not in line:
+        for token in line.split():
+            yield token
+        return
+
+    end = len(line)
+    position = 0
+    #Pieces of a token continuing at position, None between tokens
+    pending = None
+    specials = {'"': -1, "'": -1, '\\': -1}
+    while position < end:
+        for char in specials:
+            if specials[char] < position:
+                found = line.find(char, position)
+                specials[char] = found if found >= 0 else end
+        special = min(specials.itervalues())
+
+        if special > position:
+            region = line[position:special]
+            tokens = region.split()
+            ends_in_token = special < end and not region[-1].isspace()
+            if pending is not None:
+                if not region[0].isspace():
+                    pending.append(tokens.pop(0))
+                if tokens or not ends_in_token:
+                    yield "".join(pending)
+                    pending = None
+            if tokens:
+                if ends_in_token:
+                    pending = [tokens.pop()]
+                for token in tokens:
+                    yield token
+            position = special
+            if special == end:
+                break
+
+        if pending is None:
+            pending = []
+        char = line[special]
+        if char == "'":
+            close = line.find("'", special + 1)
+            if close < 0:
+                raise InputError("Unterminated quote at position %d of the input line.", special)
+            pending.append(line[special + 1:close])
+            position = close + 1
+        elif char == '\\':
+            if special + 1 >= end:
+                raise InputError("Unterminated escape at the end of the input line.")
+            pending.append(line[special + 1])
+            position = special + 2
+        else:
+            start = special + 1
+            close = line.find('"', start)
+            while True:
+                if close < 0:
+                    raise InputError("Unterminated quote at position %d of the input line.",
+                            special)
+                escape = line.find('\\', start, close)
+                if escape < 0:
+                    pending.append(line[start:close])
+                    break
+                pending.append(line[start:escape])
+                escaped = line[escape + 1]
+                if escaped == '"' or escaped == '\\':
+                    pending.append(escaped)
                 else:
-                    string = "\nUnknown command '%s'. Type 'help' for available "\
-                            "commands." % input_list[0]
-                    sys.stdout.write(string)
-            except EOFError:
-                self.vdebug("EOFError raised - Did user push ctrl-D? Exception ignored.")
-                continue
-            except (KeyboardInterrupt, SystemExit):
-                self.console.console_cleanup()
-                self.verbose("Terminating console due to system exception.")
-                raise SystemExit
+                    pending.append('\\' + escaped)
+                start = escape + 2
+                if start > close:
+                    close = line.find('"', start)
+            position = close + 1
 
-            #Console terminates with an exit call. Cleanup
-            self.console.console_cleanup()
+    if pending is not None:
+        yield "".join(pending)
 
 class _Console_Parser(object):
     """Internal
@@ -928,25 +4958,28 @@ class _Console_Parser(object):
         self.additional_args = None
 
     def _precheck_input(self, input):
-        """Sanity check input, always ordering it to a list of arguments without program name
+        """Sanity check input, always returning an iterator over the arguments without program
+        name. Strings are tokenized lazily by :func:`tokenize_line`, iterators are used as is.
         """
         if isinstance(input, list):
             if input[0] == self.program_name:
-                return input[1:]
+                return iter(input[1:])
             else:
-                return input
+                return iter(input)
         if isinstance(input, str):
-            return input.split()
+            return tokenize_line(input)
+        if hasattr(input, 'next'):
+            return input
 
-        raise TypeError("Input is not of type 'str' or 'list'")
+        raise TypeError("Input is not of type 'str', 'list' or iterator")
 
     def get_active_flags(self):
         """*getter* function to retrieve all active flags.
         Returns:
             - None if no command is parsed with :meth:`parse_line`
             - Empty list ([]) if no flags where present for last parsed line.
-            - List filled with dictionaries, {'longf':(str), 'description':(str), 'input':(),
-              'method':(callable method)}
+            - List filled with :class:`Active_Flag`, readable as {'longf':(str),
+              'description':(str), 'input':(), 'method':(callable method)}
         """
         return self.active_flags
 
@@ -962,71 +4995,53 @@ class _Console_Parser(object):
         return self.additional_args
 
     def parse_line(self, command, input, is_command=True):
-        """input can be either string or a list
+        """input can be either string, a list or an iterator of tokens, eg. the rest of a
+        :func:`tokenize_line` generator. Tokens are consumed one at a time.
+
+        Flags are looked up in the :class:`Command` flag index, a flag present more than once
+        is kept at its last position with its last input.
         """
         self.active_flags = []
         self.additional_args = []
-        inputlist = self._precheck_input(input)
+        tokens = self._precheck_input(input)
 
         if is_command:
-            inputlist = inputlist[1:]
-
-        index = 0
-        list_length = len(inputlist)
-        flag_name = None
-        while index < list_length:
-            found_active_flag = False
-            for map in command.available_flags:
-                if inputlist[index] == map["longf"]:
-                    found_active_flag = True
-                    flag_name = inputlist[index]
-                    break
-                if inputlist[index] == map["shortf"]:
-                    found_active_flag = True
-                    flag_name = inputlist[index]
-                    break
-
-            if found_active_flag:
+            next(tokens, None)
+
+        flag_index = command._flag_index
+        additional_args = self.additional_args
+        active_flags = []
+        positions = {}
+        for token in tokens:
+            map = flag_index.get(token)
+            if map is not None:
+                flag_name = token
                 input_value = None
-                if map["input"] > FLAG_INPUT_IGNORE:
-                    if (index + 1 >= list_length):
-                        type = "string"
-                        if map["input"] == FLAG_INPUT_STR:
-                            type = "str"
-                        elif map["input"] == FLAG_INPUT_INT:
-                            type = "int"
-                        elif map["input"] == FLAG_INPUT_FLOAT:
-                            type = "float"
+                if map.input > FLAG_INPUT_IGNORE:
+                    (type, convert) = _flag_inputs[map.input]
+                    value = next(tokens, None)
+                    if value is None:
                         raise InputError("Missing input for flag '%s'. Expecting %s ",
                                 flag_name, type)
-
-                    index += 1
-                    if map["input"] == FLAG_INPUT_STR:
-                        input_value = str(inputlist[index])
-                    elif map["input"] == FLAG_INPUT_INT:
-                        try:
-                            input_value = int(inputlist[index])
-                        except ValueError as e:
-                            raise InputError("Invalid input '%s' for flag '%s'. Expected int",
-                                    inputlist[index], flag_name)
-                    elif map["input"] == FLAG_INPUT_FLOAT:
-                        try:
-                            input_value = float(inputlist[index])
-                        except ValueError as e:
-                            raise InputError("Invalid input '%s' for flag '%s'. Expected float",
-                                    inputlist[index], flag_name)
-
-                flag_dict = {'longf':map["longf"], 'description':map["description"],
-                        'input':input_value, 'method':map["method"]}
-                #Sanity check if we are to add this flag dict or not: May already be present
-                for added_dict in self.active_flags:
-                    if added_dict["longf"] == flag_dict["longf"]:
-                        self.active_flags.remove(added_dict)
-                        break
-                self.active_flags.append(flag_dict)
+                    try:
+                        input_value = convert(value)
+                    except (ValueError, OverflowError, TypeError) as e:
+                        if len(value) > 40:
+                            value = value[:37] + "..."
+                        raise InputError("Invalid input '%s' for flag '%s'. Expected %s",
+                                value, flag_name, type)
+
+                #Flag may already be present: Move it to the end with its latest input
+                position = positions.get(map.longf)
+                if position is not None:
+                    active_flags[position] = None
+                positions[map.longf] = len(active_flags)
+                active_flags.append(Active_Flag(map, input_value))
             else:
-                self.additional_args.append(inputlist[index])
-            index += 1
+                additional_args.append(token)
+        if len(positions) != len(active_flags):
+            active_flags = [map for map in active_flags if map is not None]
+        self.active_flags = active_flags
 
 class _Print_Help_Console(object):
     """Assist class to pretty print Command flags or all available Commands in the console.
@@ -1034,9 +5049,18 @@ class _Print_Help_Console(object):
 
     def __init__(self, console):
         self.console = console
-        self.TS = Terminal_Size()
+        self._TS = None
+        self._rendered = None
         self.MIN_DESC_WIDTH = 20
 
+    @property
+    def TS(self):
+        """The shared :class:`Terminal_Size`, see :func:`get_terminal_size`.
+        """
+        if self._TS is None:
+            self._TS = get_terminal_size()
+        return self._TS
+
     def _calculate_bounds(self, input, print_flags=True):
         """
         Args:
@@ -1068,30 +5092,40 @@ class _Print_Help_Console(object):
         line += flag["longf"] + "  "
 
         input = flag["input"]
-        if input == FLAG_INPUT_STR:
-            line += "[str]"
-        elif input == FLAG_INPUT_INT:
-            line += "[int]"
-        elif input == FLAG_INPUT_FLOAT:
-            line += "[float]"
+        if input in _flag_inputs:
+            line += "[%s]" % _flag_inputs[input][0]
 
         return line
 
     def print_help(self, input, print_flags=True):
-        """
+        """Write the help text to STDOUT in a single write. The text is rendered again only
+        when the terminal width or the flags (commands) changed since the last call.
+
         Args:
             - input - Command object if print_flags is True. List of available commands if not.
         """
-        offset = self._calculate_bounds(input, print_flags)
+        import sys
+
         self.TS.refresh()
+        if print_flags:
+            version = input._version
+        else:
+            version = self.console._commands_version
+        key = (print_flags, self.TS.width, version)
+        if self._rendered is None or self._rendered[0] != key:
+            self._rendered = (key, self._render(input, print_flags, self.TS.width))
+        sys.stdout.write(self._rendered[1])
+
+    def _render(self, input, print_flags, width):
+        """Returns the help text for a terminal *width* characters wide, see :meth:`print_help`.
+        """
+        offset = self._calculate_bounds(input, print_flags)
         offset += 7         #magic number
-        if (self.TS.width - offset) < self.MIN_DESC_WIDTH:
-            print "Unable to write help options due to narrow terminal. Please expand it."
-            tmp = self.lineoffset_desc + self.MIN_DESC_WIDTH
-            print "Current width: %d. Minimum required width: %d" % (self.TS.width, tmp)
-            return
+        if (width - offset) < self.MIN_DESC_WIDTH:
+            return ("Unable to write help options due to narrow terminal. Please expand it.\n"
+                    "Current width: %d. Minimum required width: %d\n" %
+                    (width, offset + self.MIN_DESC_WIDTH))
 
-        usage = ""
         if print_flags:
             print_list = input.available_flags
             usage = "Usage: " + input.command_name + " [--flags] " +input.usage+ "\n"
@@ -1100,42 +5134,59 @@ class _Print_Help_Console(object):
             usage = "Usage: " + self.console.terminal.command_name + " [--flags] " +\
                 self.console.terminal.usage+ "\n"
 
-        print usage
+        lines = [usage]
+        indent = " " * offset
         for item in print_list:
             if print_flags:
                 line = self._get_flags_string(item)
-                token_list = item['description'].split()
+                token_list = item.description.split()
             else:
                 line = "  " + item.command_name
                 token_list = item.description.split()
 
-            num_padd_chars = offset - len(line)
-            line += "".join([' ' for x in xrange(num_padd_chars)])
-            line_length = len(line)
+            parts = [line, " " * (offset - len(line))]
+            line_length = max(offset, len(line))
             for token in token_list:
                 token_length = len(token)
-                if line_length + token_length >= self.TS.width:
-                    print line
-                    line = ''.join([' ' for x in xrange(offset)])
+                if line_length + token_length >= width:
+                    lines.append("".join(parts))
+                    parts = [indent]
                     line_length = offset
-                line += token + " "
+                parts.append(token + " ")
                 line_length += token_length + 1
+            line = "".join(parts)
             if len(line) > 0:
-                print line
+                lines.append(line)
+        lines.append("")
+        return "\n".join(lines)
 
 class Terminal_Size(object):
     """Return the terminal size. Works on Windows, Linux, OS X, Cygwin
+
+    Use :func:`get_terminal_size` for the process wide instance, which only probes the
+    terminal again after it has been resized.
     """
     def __init__(self):
         """
         Modules:
-            platform
+            os
         """
-        import platform
+        import os
 
         self.width = 0
         self.height = 0
-        self.current_os = platform.system()
+        #Only the shared instance of get_terminal_size watches SIGWINCH, _cached tells whether
+        #its handler is installed, _stale is set by the handler
+        self._shared = False
+        self._cached = False
+        self._stale = True
+        self._tput_size = None
+        self._tput_expires = 0
+        #Same names as platform.system(), without importing platform
+        if os.name == 'nt':
+            self.current_os = 'Windows'
+        else:
+            self.current_os = os.uname()[0]
 
         self.refresh()
 
@@ -1143,10 +5194,21 @@ class Terminal_Size(object):
         """Perform a check for terminal size. Updates attributes self.width and self.height with
         new values.
 
+        The shared instance returned by :func:`get_terminal_size` keeps its size until a
+        SIGWINCH reports that the terminal was resized.
+
         Returns:
             - **True** if terminal size has changed.
             - **False** if terminal size is unchanged.
         """
+        if self._shared:
+            self._cached = _watch_terminal_size()
+        if self._cached and not self._stale:
+            return False
+        if self._stale:
+            #Resized, tput must be asked again
+            self._tput_size = None
+        self._stale = False
         is_changed = False
         (w, h) = self.get_terminal_size()
         if w != self.width:
@@ -1209,10 +5271,19 @@ class Terminal_Size(object):
 
     def _getTS_tput(self):
         """Get terminal size from xterm. Shamelessly stolen from the internet. Source: Unknown
+        Spawns two processes, so the result is reused until a SIGWINCH reports a resize, or
+        for at most _TPUT_CACHE_SECONDS where the signal is not watched.
 
         Modules:
             subprocess
         """
+        now = time.time()
+        if self._tput_size is None or (not self._cached and now >= self._tput_expires):
+            self._tput_size = self._getTS_tput_uncached()
+            self._tput_expires = now + _TPUT_CACHE_SECONDS
+        return self._tput_size
+
+    def _getTS_tput_uncached(self):
         # get terminal width
         # src: http://stackoverflow.com/questions/263890/how-do-i-find-the-width-height-of-a-terminal-window
         try:
@@ -1233,9 +5304,11 @@ class Terminal_Size(object):
         Modules:
             fcntl, termios, struct, os
         """
+        import os
+
         def ioctl_GWINSZ(fd):
             try:
-                import fcntl, termios, struct, os
+                import fcntl, termios, struct
                 cr = struct.unpack('hh', fcntl.ioctl(fd, termios.TIOCGWINSZ,'1234'))
             except:
                 return None
@@ -1250,18 +5323,77 @@ class Terminal_Size(object):
                 pass
         if not cr:
             try:
-                cr = (env['LINES'], env['COLUMNS'])
+                cr = (os.environ['LINES'], os.environ['COLUMNS'])
             except:
                 return None
         return int(cr[1]), int(cr[0])
 
+#Seconds the tput fallback of Terminal_Size is trusted where SIGWINCH is not watched
+_TPUT_CACHE_SECONDS = 1.0
+
+_terminal_size = None
+_terminal_size_lock = threading.Lock()
+_terminal_size_watched = False
+_terminal_size_previous_handler = None
+
+def get_terminal_size():
+    """Return the process wide :class:`Terminal_Size`, refreshed. Its *refresh* only probes the
+    terminal after a SIGWINCH, or on every call where the signal is not watched (Windows, no
+    call yet from the main thread, or another SIGWINCH handler installed by the application
+    since).
+    """
+    global _terminal_size
+    with _terminal_size_lock:
+        if _terminal_size is None:
+            terminal_size = Terminal_Size()
+            terminal_size._shared = True
+            _terminal_size = terminal_size
+        _terminal_size.refresh()
+        return _terminal_size
+
+def _watch_terminal_size():
+    """Install the SIGWINCH handler invalidating the shared :class:`Terminal_Size` on the first
+    call from the main thread, the only thread that can install signal handlers. A handler
+    installed before is still called. Once the application replaces the handler, eg. by
+    starting curses, it is not installed again.
+
+    Returns:
+        True if the handler is installed and still the current one.
+    """
+    global _terminal_size_watched, _terminal_size_previous_handler
+    import signal
+
+    if not hasattr(signal, 'SIGWINCH'):
+        return False
+    if _terminal_size_watched:
+        return signal.getsignal(signal.SIGWINCH) is _on_terminal_resize
+    if not isinstance(threading.current_thread(), threading._MainThread):
+        return False
+
+    _terminal_size_previous_handler = signal.getsignal(signal.SIGWINCH)
+    signal.signal(signal.SIGWINCH, _on_terminal_resize)
+    #Restart system calls, raw_input would otherwise fail with EINTR on every resize
+    signal.siginterrupt(signal.SIGWINCH, False)
+    _terminal_size_watched = True
+    if _terminal_size is not None:
+        #The terminal may have been resized since it was probed
+        _terminal_size._stale = True
+    return True
+
+def _on_terminal_resize(signum, frame):
+    """SIGWINCH handler marking the shared :class:`Terminal_Size` stale.
+    """
+    terminal_size = _terminal_size
+    if terminal_size is not None:
+        terminal_size._stale = True
+    if callable(_terminal_size_previous_handler):
+        _terminal_size_previous_handler(signum, frame)
+
 if __name__ == '__main__':
     c = Console({'debug':DI_STDOUT}, False, False)
     shutdown = c.console_start(True, False)
     try:
-        import time
-        while threading.active_count > 0:
-            time.sleep(0.1)
-    except:
+        shutdown.wait()
+    except KeyboardInterrupt:
         shutdown.set()
 